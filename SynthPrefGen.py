@@ -1,13 +1,15 @@
 import argparse
 import os
+import numpy as np
 import torch
 import gc
 import subprocess
 import threading
-import time
+from time import time
 from uuid import uuid4
 from examples.agent import Agent
 from examples.example_set import ExampleSet
+from examples.array_example_set import ArrayExampleSet
 from examples.relation import Relation
 from utility.configuration_parser import AgentHolder, parse_configuration
 from utility.neighbor_graph import NeighborGraph
@@ -21,8 +23,14 @@ from weighted.weighted_average import WeightedAverage
 from conditional.cpnet import CPnet
 from conditional.clpm import CLPM
 from neural.neural_preferences import train_neural_preferences, train_neural_preferences_curve, prepare_example
-from annealing.simulated_annealing import learn_SA, learn_SA_mm
+from annealing.simulated_annealing import learn_SA, learn_SA_mm, cooling_schedule
+from annealing.multi_start import learn_SA_multi
+from annealing.parallel_tempering import learn_PT
+from annealing.racing import race_restarts
 import annealing.simulated_annealing as SA
+from utility.batch_eval import domain_relation_codes, example_arrays, example_agreement
+from utility.truth_cache import TruthCache
+from utility.eval_cache import EvalCache
 
 
 def main(args):
@@ -42,7 +50,7 @@ def main(args):
             with open(a_file, 'w') as fout:
                 fout.write(str(agent[0].model))
     # Build example set.
-    ex_set = ExampleSet()
+    ex_set = ArrayExampleSet(config[0])
     for agent in agents:
         temp_set = build_example_set(agent[0],agent[1],config[0])
         ex_set.add_example_list(temp_set.example_list())
@@ -236,7 +244,7 @@ def main_learn_lpm(args):
         proportion = ';'.join(proportion)
         for train, valid in ex_set.crossvalidation(5):
             start = time()
-            learner = LPM.learn_greedy(train,config[0])
+            learner = learner_function(args)(train,config[0])
             print(time()-start)
             training = evaluate_rep(train,learner)
             validation = evaluate_rep(valid,learner)
@@ -494,6 +502,18 @@ def asprin_full_experiment(args):
     print("\n")
 
 
+# Precond:
+#   args is the parsed command line arguments.
+#
+# Postcond:
+#   Returns the learning function selected by the -L option.
+def learner_function(args):
+    if args.learner[0] == 'exact':
+        return LPM.learn_exact
+    if args.learner[0] == 'wa':
+        return WeightedAverage.learn_linear
+    return LPM.learn_greedy
+
 # main for learning lpms
 def main_learn_joint_lpm(args):
     config = parse_configuration(args.config[0])
@@ -504,7 +524,7 @@ def main_learn_joint_lpm(args):
     ex_set = build_example_set_multi(agents, config[0])
     for train, valid in ex_set.crossvalidation(5):
         start = time()
-        learner = LPM.learn_greedy(train,config[0])
+        learner = learner_function(args)(train,config[0])
         print(time()-start)
         training = evaluate_multi(train,learner)
         validation = evaluate_multi(valid,learner)
@@ -515,7 +535,11 @@ def main_learn_joint_lpm(args):
             fout.write(',(' + temp + ')')
 
 # main for learning lpms
+# Only greedy maximin LPMs are learned; other -L learners are rejected.
 def main_learn_joint_lpm_mm(args):
+    if args.learner[0] != 'greedy':
+        print("Error: Problem 2 3 only learns greedy maximin LPMs, -L " + args.learner[0] + " is unavailable.")
+        return
     config = parse_configuration(args.config[0])
     agent_types = [LPM, RankingPrefFormula, PenaltyLogic, WeightedAverage, CPnet, CLPM, LPTree, ASO]
     agents = []
@@ -542,7 +566,7 @@ def main_learn_lpm_full(args):
         ex_set = build_example_set(agent[0],agent[1],config[0])
         for train, valid in ex_set.crossvalidation(5):
             start = time()
-            learner = LPM.learn_greedy(train,config[0])
+            learner = learner_function(args)(train,config[0])
             print(time()-start)
             training = evaluate_rep(train,learner)
             validation = evaluate_rep(valid,learner)
@@ -592,6 +616,104 @@ def main_learn_joint_nn(args):
         del valid
     del ex_set
 
+# Precond:
+#   args is the parsed command line arguments.
+#
+# Postcond:
+#   Returns the keyword arguments for learn_SA/learn_SA_mm selected by the
+#   command line (cooling schedule, budgets and patience).
+def sa_options(args):
+    result = {'schedule': cooling_schedule(args.schedule[0])}
+    if args.time_limit is not None:
+        result['time_limit'] = args.time_limit[0]
+    if args.max_evals is not None:
+        result['max_evals'] = args.max_evals[0]
+    if args.patience is not None:
+        result['patience'] = args.patience[0]
+    return result
+
+# Precond:
+#   args is the parsed command line arguments.
+#
+# Postcond:
+#   Returns the list of search options (SA, multi-start or parallel
+#   tempering) given on the command line with other than default values.
+def sa_flags(args):
+    result = []
+    if args.schedule[0] != 'geometric':
+        result.append('--schedule')
+    if args.time_limit is not None:
+        result.append('--time-limit')
+    if args.max_evals is not None:
+        result.append('--max-evals')
+    if args.patience is not None:
+        result.append('--patience')
+    if args.starts[0] != 1:
+        result.append('--starts')
+    if args.workers[0] != 1:
+        result.append('--workers')
+    if args.replicas[0] != 1:
+        result.append('--replicas')
+    return result
+
+# Precond:
+#   stats is the dictionary filled in by learn_SA/learn_SA_mm.
+#
+# Postcond:
+#   Prints the iteration count, time and stopping reason of the run.
+def print_sa_stats(stats):
+    print('SA', stats['iterations'], stats['time'], stats['stop'])
+
+# Precond:
+#   args is the parsed command line arguments.
+#   l_class is the learner class.
+#   domain is a valid Domain object.
+#   info is the learner configuration dictionary.
+#   train is the example set to learn from.
+#   maximin is True to learn with learn_SA_mm instead of learn_SA.
+#
+# Postcond:
+#   Learns from randomly built starting learners with simulated annealing,
+#   one chain per start (see --starts and --workers), or with parallel
+#   tempering when --replicas is above 1, prints the run's stats and returns
+#   the best learner.
+#   Parallel tempering is bounded by --time-limit and --max-evals (per
+#   replica); a warning names any other search options given, which then
+#   have no effect.
+#   WeightedAverage learners have no neighbors and are fit directly (see
+#   WeightedAverage.learn_linear) instead, with a warning naming any search
+#   options given, which then have no effect.
+def run_SA(args, l_class, domain, info, train, maximin=False):
+    if l_class is WeightedAverage:
+        ignored = sa_flags(args)
+        if maximin:
+            ignored.append('maximin')
+        if len(ignored) > 0:
+            print("Warning: WA learners are fit by WeightedAverage.learn_linear, ignoring " + ', '.join(ignored) + ".")
+        return WeightedAverage.learn_linear(train, domain)
+    stats = {}
+    if args.replicas[0] > 1:
+        ignored = [flag for flag in sa_flags(args) if flag in ['--schedule','--patience','--starts','--workers']]
+        if len(ignored) > 0:
+            print("Warning: parallel tempering runs one process per replica at fixed temperatures, ignoring " + ', '.join(ignored) + ".")
+        options = sa_options(args)
+        learners = [l_class.random(domain,info) for i in range(args.replicas[0])]
+        eval_func = SA.evaluate_util
+        if maximin:
+            eval_func = SA.evaluate_maximin
+        learner = learn_PT(learners, train, eval_func, time_limit=options.get('time_limit'), max_evals=options.get('max_evals'), stats=stats)
+        print('PT', stats['rounds'], stats['swaps'], stats['accepted'], stats['time'], stats['stop'])
+        return learner
+    if args.starts[0] > 1:
+        learners = [l_class.random(domain,info) for i in range(args.starts[0])]
+        learner = learn_SA_multi(learners, train, args.workers[0], maximin, stats, **sa_options(args))
+    elif maximin:
+        learner = learn_SA_mm(l_class.random(domain,info), train, stats=stats, **sa_options(args))
+    else:
+        learner = learn_SA(l_class.random(domain,info), train, stats=stats, **sa_options(args))
+    print_sa_stats(stats)
+    return learner
+
 def main_learn_joint_SA(args):
     agent_types = [LPM, RankingPrefFormula, PenaltyLogic, WeightedAverage, CPnet, CLPM, LPTree, ASO]
     config = parse_configuration(args.config[0])
@@ -615,9 +737,8 @@ def main_learn_joint_SA(args):
     ex_set = build_example_set_multi(agents, config[0])
     for train, valid in ex_set.crossvalidation(5):
         start = time()
-        learner = l_class.random(config[0],info)
         # learner = LPM.random(config[0], info)
-        learner = learn_SA(learner, train)
+        learner = run_SA(args, l_class, config[0], info, train, False)
         print(time()-start)
         training = evaluate_multi(train,learner)
         validation = evaluate_multi(valid,learner)
@@ -655,9 +776,8 @@ def main_learn_joint_SA_mm(args):
     ex_set = build_example_set_multi(agents, config[0])
     for train, valid in ex_set.crossvalidation(5):
         start = time()
-        learner = l_class.random(config[0],info)
         # learner = LPM.random(config[0], info)
-        learner = learn_SA_mm(learner, train)
+        learner = run_SA(args, l_class, config[0], info, train, True)
         print(time()-start)
         training = evaluate_multi(train,learner)
         validation = evaluate_multi(valid,learner)
@@ -698,10 +818,9 @@ def main_learn_SA(args):
         proportion = ';'.join(proportion)
         for train, valid in ex_set.crossvalidation(5):
             start = time()
-            learner = l_class.random(config[0],info)
             # learner = RankingPrefFormula.random(config[0],info)
             # learner = LPM.random(config[0], info)
-            learner = learn_SA(learner, train)
+            learner = run_SA(args, l_class, config[0], info, train, False)
             print(time()-start)
             training = evaluate_rep(train,learner)
             validation = evaluate_rep(valid,learner)
@@ -734,10 +853,9 @@ def main_learn_SA_full(args):
         ex_set = build_example_set(agent[0],agent[1],config[0])
         for train, valid in ex_set.crossvalidation(5):
             start = time()
-            learner = l_class.random(config[0],info)
             # learner = RankingPrefFormula.random(config[0],info)
             # learner = LPM.random(config[0], info)
-            learner = learn_SA(learner, train)
+            learner = run_SA(args, l_class, config[0], info, train, False)
             print(time()-start)
             training = evaluate_rep(train,learner)
             validation = evaluate_rep(valid,learner)
@@ -815,21 +933,31 @@ def main_build_neighbor_monte_carlo(args):
     for holder in config[1]:
         agents.append(make_agent(holder,agent_types,config[0]))
     ex_set = build_example_set_multi(agents, config[0])
-    for i in range(runs):
-        learner = l_class.random(config[0],info)
-        # learner = SA.hillclimb(learner, ex_set, SA.evaluate_util)
-        learner = SA.hillclimb(learner, ex_set, SA.evaluate_maximin)
-        # results.append(SA.evaluate_util(learner, ex_set))
-        results.append(SA.evaluate_maximin(learner, ex_set))
+    cache = EvalCache(args.eval_cache[0])
+    if args.race is not None:
+        learners = [l_class.random(config[0],info) for i in range(runs)]
+        # raced = race_restarts(learners, ex_set, SA.evaluate_util, args.race[0], cache=cache)
+        raced = race_restarts(learners, ex_set, SA.evaluate_maximin, args.race[0], cache=cache)
+        # Only the survivors of the race are climbed to a local maximum, so
+        # the pill's counts and statistics cover them alone.
+        results = list(map(lambda x: x[1], raced))
+        print("Race:",len(results),"of",runs,"restarts finished")
+    else:
+        for i in range(runs):
+            learner = l_class.random(config[0],info)
+            # learner, eval = SA.hillclimb_scored(learner, ex_set, SA.evaluate_util, cache=cache)
+            learner, eval = SA.hillclimb_scored(learner, ex_set, SA.evaluate_maximin, cache=cache)
+            results.append(eval)
     average_maxima = 0.0
     for i in results:
         average_maxima += i
     average_maxima = average_maxima/(len(results))
-    stats = [runs,min(results),average_maxima,max(results)]
+    stats = [len(results),min(results),average_maxima,max(results)]
     stats = list(map(lambda x: str(x),stats))
     with open(args.output[0], 'a') as fout:
         fout.write(',(' + ';'.join(stats) + ')')
     print("Time:",time()-start)
+    print("Eval cache hit rate:",cache.hit_rate(),"entries:",len(cache))
 
 def main_hillclimb_rr(args):
     config = parse_configuration(args.config[0])
@@ -857,20 +985,29 @@ def main_hillclimb_rr(args):
     for holder in config[1]:
         agents.append(make_agent(holder,agent_types,config[0]))
     ex_set = build_example_set_multi(agents, config[0])
-    for i in range(runs):
-        learner = l_class.random(config[0],info)
-        learner = SA.hillclimb(learner, ex_set, SA.evaluate_util)
-        # learner = SA.hillclimb(learner, ex_set, SA.evaluate_maximin)
-        eval = SA.evaluate_util(learner, ex_set)
-        # eval = SA.evaluate_maximin(learner, ex_set)
-        if eval > max_eval:
-            max_eval = eval
-        if (i+1)%(stats[0]) == 0:
+    cache = EvalCache(args.eval_cache[0])
+    if args.race is not None:
+        # Race each block of restarts between reported maxima.
+        for i in range(0, runs, stats[0]):
+            learners = [l_class.random(config[0],info) for j in range(stats[0])]
+            raced = race_restarts(learners, ex_set, SA.evaluate_util, args.race[0], cache=cache)
+            # raced = race_restarts(learners, ex_set, SA.evaluate_maximin, args.race[0], cache=cache)
+            max_eval = max([max_eval] + list(map(lambda x: x[1], raced)))
             stats.append(max_eval)
+    else:
+        for i in range(runs):
+            learner = l_class.random(config[0],info)
+            learner, eval = SA.hillclimb_scored(learner, ex_set, SA.evaluate_util, cache=cache)
+            # learner, eval = SA.hillclimb_scored(learner, ex_set, SA.evaluate_maximin, cache=cache)
+            if eval > max_eval:
+                max_eval = eval
+            if (i+1)%(stats[0]) == 0:
+                stats.append(max_eval)
     stats = list(map(lambda x: str(x),stats))
     with open(args.output[0], 'a') as fout:
         fout.write(',(' + ';'.join(stats) + ')')
     print("Time:",time()-start)
+    print("Eval cache hit rate:",cache.hit_rate(),"entries:",len(cache))
 
 # Precond:
 #   ex_set is a valid ExampleSet object
@@ -879,9 +1016,8 @@ def main_hillclimb_rr(args):
 #   Returns a list which provides a break down of the proportion of each
 #   relation.
 def ex_proport(ex_set):
-    result = [0 for i in range(6)]
-    for ex in ex_set.example_list():
-        result[ex.get_relation().value+2] += 1
+    relation = example_arrays(ex_set)[2]
+    result = np.bincount(relation.astype(np.int64)+2, minlength=6).tolist()
     for i in range(len(result)):
         result[i] = result[i]/float(len(ex_set))
     return result
@@ -894,6 +1030,9 @@ def ex_proport(ex_set):
 # Postcond:
 #   Returns the proportion of examples in the ex_set.
 def evaluate_rep(ex_set, learner):
+    if hasattr(learner, 'compare_batch'):
+        correct, _ = example_agreement(learner, ex_set)
+        return int(np.count_nonzero(correct))/float(len(ex_set))
     count = 0
     for example in ex_set.example_list():
         alts = example.get_alts()
@@ -907,16 +1046,12 @@ def evaluate_rep(ex_set, learner):
 #   domain is a valid Domain object.
 #
 # Postcond:
-#   Returns the proportion of examples in the ex_set.
+#   Returns the proportion of pairs in the domain on which the learner agrees
+#   with the agent.
+#   The agent's relations come from its cached ground truth.
 def evaluate_rep_full(agent, learner, domain):
-    count = 0
-    total = 0
-    for pair in domain.each_pair():
-        rel = agent.build_example(pair[0],pair[1]).get_relation()
-        if learner.compare(pair[0],pair[1]) == rel:
-            count += 1
-        total += 1
-    return count/float(total)
+    learned = domain_relation_codes(learner, domain)
+    return float(np.mean(learned == agent.ground_truth()))
 
 # Precond:
 #   agents is a list of the original agents learned from.
@@ -924,18 +1059,14 @@ def evaluate_rep_full(agent, learner, domain):
 #   domain is a valid Domain object.
 #
 # Postcond:
-#   Returns the proportion of examples in the ex_set.
+#   Returns the proportion of (agent, pair) combinations on which the learner
+#   agrees with the agent.
 def evaluate_rep_full_multi(agents, learner, domain):
+    learned = domain_relation_codes(learner, domain)
     count = 0
-    pair_count = 0
     for agent in agents:
-        for pair in domain.each_pair():
-            # print(agent.build_example(pair[0],pair[1]))
-            rel = agent.build_example(pair[0],pair[1]).get_relation()
-            if learner.compare(pair[0],pair[1]) == rel:
-                count += 1
-            pair_count += 1
-    return count/float(pair_count)
+        count += int(np.count_nonzero(learned == agent.ground_truth()))
+    return count/float(len(agents)*len(learned))
 
 # Precond:
 #   agents is a list of the original agents learned from.
@@ -943,18 +1074,13 @@ def evaluate_rep_full_multi(agents, learner, domain):
 #   domain is a valid Domain object.
 #
 # Postcond:
-#   Returns the proportion of examples in the ex_set.
+#   Returns the smallest proportion, over the agents, of pairs in the domain
+#   on which the learner agrees with the agent.
 def evaluate_rep_full_maximin(agents, learner, domain):
+    learned = domain_relation_codes(learner, domain)
     current = None
     for agent in agents:
-        count = 0
-        pair_count = 0
-        for pair in domain.each_pair():
-            rel = agent.build_example(pair[0],pair[1]).get_relation()
-            if learner.compare(pair[0],pair[1]) == rel:
-                count += 1
-            pair_count += 1
-        count = count/float(pair_count)
+        count = float(np.mean(learned == agent.ground_truth()))
         if current == None or count < current:
             current = count
     return current
@@ -988,11 +1114,17 @@ def evaluate_multi(ex_set, learner):
     agent_counts = {}
     for agent in ex_set.get_agents():
         agent_counts[agent] = 0
-    for example in ex_set.example_list():
-        alts = example.get_alts()
-        if learner.compare(alts[0],alts[1]) == example.get_relation():
-            if example.get_agent() is not None:
-                agent_counts[example.get_agent()] += 1
+    if hasattr(learner, 'compare_batch'):
+        correct, agent_ids = example_agreement(learner, ex_set)
+        for agent in agent_counts:
+            if agent is not None and agent != 0:
+                agent_counts[agent] = int(np.count_nonzero(correct[agent_ids == agent]))
+    else:
+        for example in ex_set.example_list():
+            alts = example.get_alts()
+            if learner.compare(alts[0],alts[1]) == example.get_relation():
+                if example.get_agent() is not None:
+                    agent_counts[example.get_agent()] += 1
     agents = list(agent_counts.keys())
     agents.sort()
     result = []
@@ -1024,8 +1156,9 @@ def evaluate_cuda_multi(ex_set, learner, device=None):
         label = learner.forward_squash(inp)#.to(torch.device('cpu'))
         label = Relation.parse_label(label)
         if label.value == expect-2:
-            if ex_set.get(i).get_agent() is not None:
-                agent_counts[ex_set.get(i).get_agent()] += 1
+            agent = ex_set.get(i).get_agent()
+            if agent is not None:
+                agent_counts[agent] += 1
     result = []
     agents = list(agent_counts.keys())
     agents.sort()
@@ -1119,20 +1252,12 @@ def build_NN_pref_graph(domain, learner, device=None):
 # Postcond:
 #   Returns the proportion of correctly classified example over the entire
 #   pairwise comparison space of the domain.
+#   The network labels the pairs in batches on the device it resides on.
 def full_cuda_eval(domain, learner, agent, device=None):
-    count = 0
-    total = 0
-    for pair in domain.each_pair():
-        total += 1
-        expect = agent.build_example(pair[0],pair[1]).relation
-        inp = prepare_pair(pair)
-        if device is not None:
-            inp = inp.to(device)
-        label = learner.forward_squash(inp)
-        label = Relation.parse_label(label)
-        if label == expect:
-            count += 1
-    return count/(float(total))
+    if device is not None:
+        learner = learner.to(device)
+    learned = domain_relation_codes(learner, domain)
+    return float(np.mean(learned == agent.ground_truth()))
 
 # Precond:
 #   agent is a valid AgentHolder object.
@@ -1157,11 +1282,9 @@ def make_agent(agent, types, domain):
 # Postcond:
 #   Returns the example set for the agent.
 def build_example_set(agent, size, domain):
-    result = ExampleSet()
-    pairs = domain.random_pair_set(size)
-    for pair in pairs:
-        result.add_example(agent.build_example(pair[0],pair[1]))
-    del pairs
+    result = ArrayExampleSet(domain, size)
+    alt1, alt2 = domain.random_pair_array(size)
+    result.add_arrays(alt1, alt2, agent.label_pairs(alt1, alt2), agent.id)
     return result
 
 # Precond:
@@ -1171,12 +1294,10 @@ def build_example_set(agent, size, domain):
 # Postcond:
 #   Returns the example set for the agent.
 def build_example_set_multi(agents, domain):
-    result = ExampleSet()
+    result = ArrayExampleSet(domain, sum(map(lambda x: x[1], agents)))
     for agent in agents:
-        pairs = domain.random_pair_set(agent[1])
-        for pair in pairs:
-            result.add_example(agent[0].build_example(pair[0],pair[1]))
-        del pairs
+        alt1, alt2 = domain.random_pair_array(agent[1])
+        result.add_arrays(alt1, alt2, agent[0].label_pairs(alt1, alt2), agent[0].id)
     return result
 
 def build_parser():
@@ -1185,6 +1306,18 @@ def build_parser():
     parser.add_argument('-l', dest='layers', metavar='n', type=int, nargs=1, default=[3], help='The number of neural net layers')
     parser.add_argument('-i', dest='learn_conf', metavar='filename', type=str, nargs=1, help='Name of the learner configuration file.', default='a.exs')
     parser.add_argument('-o', dest='output', metavar='filename', type=str, nargs=1, help='Name of the output file.', default='a.exs')
+    parser.add_argument('-L', dest='learner', metavar='name', type=str, nargs=1, default=['greedy'], choices=['greedy','exact','wa'], help='The learning algorithm for problem 2: greedy or exact (LPMs), or wa (weighted averages). Problem 2 3 (maximin) only supports greedy.')
+    parser.add_argument('--schedule', dest='schedule', metavar='name', type=str, nargs=1, default=['geometric'], choices=['geometric','lundy-mees','adaptive'], help='The SA cooling schedule (geometric, lundy-mees or adaptive).')
+    parser.add_argument('--time-limit', dest='time_limit', metavar='seconds', type=float, nargs=1, default=None, help='Stop each SA or parallel tempering run after this many seconds.')
+    parser.add_argument('--max-evals', dest='max_evals', metavar='n', type=int, nargs=1, default=None, help='Stop each SA run, or each parallel tempering replica, after this many neighbor evaluations.')
+    parser.add_argument('--patience', dest='patience', metavar='n', type=int, nargs=1, default=None, help='Stop each SA run after this many steps without an improving move.')
+    parser.add_argument('--starts', dest='starts', metavar='k', type=int, nargs=1, default=[1], help='The number of independent SA chains per run (the best is kept).')
+    parser.add_argument('--workers', dest='workers', metavar='n', type=int, nargs=1, default=[1], help='The number of processes running SA chains.')
+    parser.add_argument('--replicas', dest='replicas', metavar='r', type=int, nargs=1, default=[1], help='Learn with parallel tempering over this many replicas (one process each) instead of SA.')
+    parser.add_argument('--eval-cache', dest='eval_cache', metavar='n', type=int, nargs=1, default=[2**16], help='The number of model scores and hill climbing outcomes kept by the hill climbing restart searches.')
+    parser.add_argument('--race', dest='race', metavar='delta', type=float, nargs=1, default=None, help='Race the hill climbing restart searches on growing example subsets, with confidence bounds failing with probability delta. Dropped restarts are discarded, so pills only cover the restarts which finish.')
+    parser.add_argument('-c', dest='truth_cache', metavar='directory', type=str, nargs=1, default=None, help='Directory in which to cache agent ground truths between runs.')
+    parser.add_argument('-C', dest='truth_cache_mb', metavar='n', type=int, nargs=1, default=[1024], help='Size bound of the ground truth cache in megabytes.')
     parser.add_argument('config', metavar='filename', type=str, nargs=1, help="The config file to use.")
     return parser
 
@@ -1192,6 +1325,8 @@ def build_parser():
 
 if __name__=="__main__":
     args = build_parser().parse_args()
+    if args.truth_cache is not None:
+        Agent.truth_cache = TruthCache(args.truth_cache[0], args.truth_cache_mb[0]*2**20)
     # Neural network problems
     if args.problem[0] == 1:
         if args.problem[1] == 1:
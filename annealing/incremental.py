@@ -0,0 +1,366 @@
+# File: incremental.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   Incremental evaluation of neighbors during simulated annealing.
+# Notes:
+#   An evaluator holds a learner, the example set and cached per-example
+#   state. propose(neighbor) scores a neighbor of the current learner by
+#   re-scoring only the examples its move can affect (see the move attribute
+#   set by random_neighbor/neighbors), then commit() makes the neighbor the
+#   current learner or rollback() restores the cached state.
+#   Scores equal those of evaluate_util (or evaluate_maximin when maximin is
+#   set) for the same learner.
+#   Neighbors without a recognised move are scored by recomputing the state
+#   for the whole example set.
+
+import sys, os
+sys.path.insert(0, os.path.abspath('..'))
+
+import numpy as np
+from examples.relation import Relation
+from lexicographic.lpm import LPM
+from ranking.ranking_formula import RankingPrefFormula
+from utility.batch_eval import example_arrays
+
+# Precond:
+#   ptr is a (K+1,) integer array of offsets into data (CSR layout).
+#   data is an integer array of row indices.
+#   items is an integer array of indices between 0 and K-1.
+#
+# Postcond:
+#   Returns the sorted unique rows listed for any of the items.
+def gather_rows(ptr, data, items):
+    starts = ptr[items]
+    lengths = ptr[items+1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+    return np.unique(data[offsets])
+
+class IncrementalEvaluator:
+    # Precond:
+    #   learner is the learner to start from.
+    #   ex_set is a valid ExampleSet or ArrayExampleSet object.
+    #   maximin is True to score by the least satisfied agent.
+    #
+    # Postcond:
+    #   Builds the evaluator and the cached state for the learner.
+    def __init__(self, learner, ex_set, maximin=False):
+        alt1, alt2, relation, agent = example_arrays(ex_set)
+        self.learner = learner
+        self.maximin = maximin
+        self.relation = relation
+        self.size = len(relation)
+        agents = list(ex_set.get_agents())
+        self.group = np.zeros(self.size, dtype=np.int64)
+        for i in range(len(agents)):
+            self.group[agent == agents[i]] = i
+        self.totals = np.bincount(self.group, minlength=len(agents))
+        self.setup(np.asarray(alt1), np.asarray(alt2))
+        self.correct = self.codes == relation
+        self.counts = np.bincount(self.group[self.correct], minlength=len(agents))
+        self.pending = None
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the score of the current (or proposed) learner.
+    def score(self):
+        if not self.maximin:
+            return int(self.counts.sum())/float(self.size)
+        result = None
+        for i in range(len(self.totals)):
+            value = int(self.counts[i])/int(self.totals[i])
+            if result is None or value < result:
+                result = value
+        return result
+
+    # Precond:
+    #   neighbor is a neighbor of the current learner.
+    #
+    # Postcond:
+    #   Updates the cached state for the neighbor and returns its score.
+    #   Must be followed by commit() or rollback().
+    def propose(self, neighbor):
+        rows, codes = self.changes(neighbor)
+        old = self.correct[rows]
+        new = codes == self.relation[rows]
+        delta = np.bincount(self.group[rows], weights=new.astype(np.int64)-old, minlength=len(self.counts))
+        self.pending = (neighbor, rows, old, self.codes[rows])
+        self.codes[rows] = codes
+        self.correct[rows] = new
+        self.counts = self.counts + delta.astype(np.int64)
+        return self.score()
+
+    # Precond:
+    #   propose has been called.
+    #
+    # Postcond:
+    #   Makes the proposed neighbor the current learner.
+    def commit(self):
+        self.learner = self.pending[0]
+        self.commit_changes()
+        self.pending = None
+
+    # Precond:
+    #   propose has been called.
+    #
+    # Postcond:
+    #   Restores the cached state of the current learner.
+    def rollback(self):
+        _, rows, old, codes = self.pending
+        delta = np.bincount(self.group[rows], weights=old.astype(np.int64)-self.correct[rows], minlength=len(self.counts))
+        self.counts = self.counts + delta.astype(np.int64)
+        self.correct[rows] = old
+        self.codes[rows] = codes
+        self.rollback_changes()
+        self.pending = None
+
+class RPFEvaluator(IncrementalEvaluator):
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Caches the rank of each distinct alternative, the examples each
+    #   alternative appears in and the relation code of each example.
+    #   Alternatives outside the domain keep a fixed rank.
+    def setup(self, alt1, alt2):
+        domain = self.learner.domain
+        alts = np.concatenate([alt1, alt2]).reshape(2*self.size, -1)
+        valid = domain.contains_array(alts)
+        codes = np.where(valid, domain.encode_array(alts) if len(alts) > 0 else 0, -1)
+        unique, inverse = np.unique(codes, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        self.fixed = unique < 0
+        self.alts = domain.decode_array(np.maximum(unique, 0))
+        self.first = inverse[:self.size]
+        self.second = inverse[self.size:]
+        order = np.argsort(inverse, kind='stable')
+        self.ptr = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(unique)))])
+        self.rows = (order % max(self.size, 1)).astype(np.int64)
+        self.rank = self.learner.rank_of_batch(self.alts)
+        self.rank[self.fixed] = len(self.learner.ranks)+1
+        self.codes = self.relation_codes(np.arange(self.size))
+
+    # Precond:
+    #   rows is an integer array of example rows.
+    #
+    # Postcond:
+    #   Returns the relation codes of the rows from the cached ranks.
+    def relation_codes(self, rows):
+        rank1 = self.rank[self.first[rows]]
+        rank2 = self.rank[self.second[rows]]
+        result = np.full(len(rows), Relation.equal().value, dtype=np.int8)
+        result[rank1 < rank2] = Relation.strict_dispreference().value
+        result[rank1 > rank2] = Relation.strict_preference().value
+        return result
+
+    # Precond:
+    #   neighbor is a neighbor of the current learner.
+    #
+    # Postcond:
+    #   Updates the cached ranks for the neighbor and returns the affected
+    #   example rows with their new relation codes.
+    def changes(self, neighbor):
+        move = getattr(neighbor, 'move', None)
+        total = len(neighbor.ranks)
+        if (move is None or move[0] != 'rank' or
+                total != len(self.learner.ranks)):
+            rank = neighbor.rank_of_batch(self.alts)
+            rank[self.fixed] = total+1
+            changed = np.flatnonzero(rank != self.rank)
+            new = rank[changed]
+        else:
+            i = move[1]
+            candidates = np.flatnonzero((self.rank >= i+1) & ~self.fixed)
+            current = self.rank[candidates]
+            satisfied = neighbor.ranks[i].satisfied(self.alts[candidates])
+            new = current.copy()
+            new[satisfied] = i+1
+            # Alternatives which lost rank i fall to the next satisfied rank.
+            lost = np.flatnonzero(~satisfied & (current == i+1))
+            if len(lost) > 0:
+                lost_alts = self.alts[candidates[lost]]
+                fallback = np.full(len(lost), total+1, dtype=self.rank.dtype)
+                for j in range(total-1,i,-1):
+                    fallback[neighbor.ranks[j].satisfied(lost_alts)] = j+1
+                new[lost] = fallback
+            keep = new != current
+            changed = candidates[keep]
+            new = new[keep]
+        self.undo = (changed, self.rank[changed])
+        self.rank[changed] = new
+        rows = gather_rows(self.ptr, self.rows, changed)
+        return (rows, self.relation_codes(rows))
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Keeps the proposed ranks.
+    def commit_changes(self):
+        self.undo = None
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Restores the ranks of the current learner.
+    def rollback_changes(self):
+        changed, rank = self.undo
+        self.rank[changed] = rank
+        self.undo = None
+
+class LPMEvaluator(IncrementalEvaluator):
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Caches the deciding attribute of each example (-1 if none), the
+    #   examples grouped by deciding attribute and the relation code of each
+    #   example.
+    def setup(self, alt1, alt2):
+        self.alt1 = alt1
+        self.alt2 = alt2
+        self.differ = alt1 != alt2
+        self.ranks = self.learner.rank_table()
+        self.decider = self.deciders(self.learner.importance)
+        self.buckets = self.bucket(self.decider)
+        self.codes = self.relation_codes(np.arange(self.size), self.decider)
+
+    # Precond:
+    #   importance is a list of attributes, most important first.
+    #
+    # Postcond:
+    #   Returns the (N,) array of the first attribute in importance on which
+    #   each example differs, or -1 if there is none.
+    def deciders(self, importance):
+        result = np.full(self.size, -1, dtype=np.int64)
+        if len(importance) == 0 or self.size == 0:
+            return result
+        importance = np.array(importance)
+        differ = self.differ[:,importance]
+        first = np.argmax(differ, axis=1)
+        found = differ[np.arange(self.size),first]
+        result[found] = importance[first[found]]
+        return result
+
+    # Precond:
+    #   decider is an (N,) array of deciding attributes.
+    #
+    # Postcond:
+    #   Returns a dictionary from each attribute to the sorted array of rows
+    #   it decides.
+    def bucket(self, decider):
+        order = np.argsort(decider, kind='stable')
+        keys, starts = np.unique(decider[order], return_index=True)
+        ends = list(starts[1:]) + [len(order)]
+        result = {}
+        for i in range(len(keys)):
+            result[int(keys[i])] = order[starts[i]:ends[i]]
+        return result
+
+    # Precond:
+    #   rows is an integer array of example rows.
+    #   decider is an array of the deciding attribute of each row.
+    #
+    # Postcond:
+    #   Returns the relation codes of the rows.
+    def relation_codes(self, rows, decider):
+        result = np.full(len(rows), Relation.equal().value, dtype=np.int8)
+        found = decider >= 0
+        rows = rows[found]
+        attrs = decider[found]
+        better = self.ranks[attrs,self.alt1[rows,attrs]] < self.ranks[attrs,self.alt2[rows,attrs]]
+        result[found] = np.where(better, Relation.strict_preference().value,
+                                 Relation.strict_dispreference().value)
+        return result
+
+    # Precond:
+    #   neighbor is a neighbor of the current learner.
+    #
+    # Postcond:
+    #   Returns the affected example rows with their new relation codes.
+    def changes(self, neighbor):
+        move = getattr(neighbor, 'move', None)
+        current = self.learner
+        self.undo = None
+        if move is not None and move[0] == 'importance':
+            i = move[1]
+            a = current.importance[i]
+            b = current.importance[i+1]
+            if neighbor.importance[i] == b and neighbor.importance[i+1] == a:
+                rows = self.buckets.get(a, np.zeros(0, dtype=np.int64))
+                rows = rows[self.differ[rows,b]]
+                self.undo = ('importance', rows, a, b)
+                return (rows, self.relation_codes(rows, np.full(len(rows), b)))
+        if move is not None and move[0] == 'order':
+            a, j = move[1], move[2]
+            v = current.orders[a][j]
+            w = current.orders[a][j+1]
+            if neighbor.orders[a][j] == w and neighbor.orders[a][j+1] == v:
+                rows = self.buckets.get(a, np.zeros(0, dtype=np.int64))
+                x1 = self.alt1[rows,a]
+                x2 = self.alt2[rows,a]
+                rows = rows[((x1 == v) & (x2 == w)) | ((x1 == w) & (x2 == v))]
+                self.undo = ('order', rows, a, v, w)
+                return (rows, -self.codes[rows])
+        self.undo = ('full', neighbor)
+        decider = self.deciders(neighbor.importance)
+        ranks = self.ranks
+        self.ranks = neighbor.rank_table()
+        codes = self.relation_codes(np.arange(self.size), decider)
+        self.ranks = ranks
+        self.full = decider
+        return (np.arange(self.size), codes)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Updates the deciders, buckets and rank table for the accepted move.
+    def commit_changes(self):
+        if self.undo[0] == 'importance':
+            _, rows, a, b = self.undo
+            self.decider[rows] = b
+            self.buckets[a] = np.setdiff1d(self.buckets[a], rows, assume_unique=True)
+            self.buckets[b] = np.union1d(self.buckets.get(b, np.zeros(0, dtype=np.int64)), rows)
+        elif self.undo[0] == 'order':
+            _, _, a, v, w = self.undo
+            rank = self.ranks[a,v]
+            self.ranks[a,v] = self.ranks[a,w]
+            self.ranks[a,w] = rank
+        else:
+            self.decider = self.full
+            self.buckets = self.bucket(self.decider)
+            self.ranks = self.learner.rank_table()
+            self.full = None
+        self.undo = None
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Discards the proposed move.
+    def rollback_changes(self):
+        self.full = None
+        self.undo = None
+
+# Precond:
+#   learner is a learner to evaluate.
+#   ex_set is a valid ExampleSet or ArrayExampleSet object.
+#   maximin is True to score by the least satisfied agent.
+#
+# Postcond:
+#   Returns an incremental evaluator for the learner, or None if there is
+#   none for the learner's class.
+def incremental_evaluator(learner, ex_set, maximin=False):
+    if isinstance(learner, RankingPrefFormula):
+        return RPFEvaluator(learner, ex_set, maximin)
+    if isinstance(learner, LPM):
+        return LPMEvaluator(learner, ex_set, maximin)
+    return None
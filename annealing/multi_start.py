@@ -0,0 +1,89 @@
+# File: multi_start.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   Runs several independent simulated annealing chains in parallel and keeps
+#   the best result.
+# Notes:
+#   Workers receive the example set once, through the pool initializer, and
+#   each chain only ships its starting learner and seed. With the fork start
+#   method (the default on Linux) the example set is inherited rather than
+#   pickled.
+
+import random
+import multiprocessing as mp
+from annealing.simulated_annealing import learn_SA, learn_SA_mm, evaluate_util, evaluate_maximin
+
+# The example set and settings of a worker process (see start_worker).
+worker_data = {}
+
+# Precond:
+#   ex_set is the example set to learn from.
+#   maximin is True to learn with learn_SA_mm.
+#   options is a dictionary of keyword arguments for learn_SA/learn_SA_mm.
+#
+# Postcond:
+#   Stores the arguments for the chains run by this process.
+def start_worker(ex_set, maximin, options):
+    worker_data['ex_set'] = ex_set
+    worker_data['maximin'] = maximin
+    worker_data['options'] = options
+
+# Precond:
+#   task is a pair (learner, seed) of a starting learner and a random seed.
+#   start_worker has been called in this process.
+#
+# Postcond:
+#   Runs one chain and returns a tuple (learner, score, stats) of the learned
+#   learner, its training score and the chain's stats.
+def run_chain(task):
+    learner, seed = task
+    random.seed(seed)
+    ex_set = worker_data['ex_set']
+    stats = {}
+    if worker_data['maximin']:
+        learner = learn_SA_mm(learner, ex_set, stats=stats, **worker_data['options'])
+        score = evaluate_maximin(learner, ex_set)
+    else:
+        learner = learn_SA(learner, ex_set, stats=stats, **worker_data['options'])
+        score = evaluate_util(learner, ex_set)
+    return (learner, score, stats)
+
+# Precond:
+#   learners is a list of starting learners, one per chain.
+#   ex_set is the example set to learn from.
+#   workers is the number of processes to use.
+#   maximin is True to learn with learn_SA_mm, otherwise learn_SA is used.
+#   stats is a dictionary to fill with a report of the best chain, or None.
+#   options are further keyword arguments for learn_SA/learn_SA_mm.
+#
+# Postcond:
+#   Runs one chain from each learner, each with its own seed drawn from the
+#   random module, and returns the learner with the best training score
+#   (the earliest chain on ties).
+#   stats receives the best chain's stats, plus starts (the number of chains)
+#   and scores (the training score of every chain).
+def learn_SA_multi(learners, ex_set, workers=1, maximin=False, stats=None, **options):
+    tasks = [(learner, random.getrandbits(32)) for learner in learners]
+    if workers <= 1 or len(tasks) <= 1:
+        start_worker(ex_set, maximin, options)
+        results = list(map(run_chain, tasks))
+    else:
+        if 'fork' in mp.get_all_start_methods():
+            context = mp.get_context('fork')
+        else:
+            context = mp.get_context()
+        pool = context.Pool(min(workers, len(tasks)), start_worker, (ex_set, maximin, options))
+        try:
+            results = pool.map(run_chain, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    best = 0
+    for i in range(1,len(results)):
+        if results[i][1] > results[best][1]:
+            best = i
+    if stats is not None:
+        stats.update(results[best][2])
+        stats['starts'] = len(results)
+        stats['scores'] = [result[1] for result in results]
+    return results[best][0]
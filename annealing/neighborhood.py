@@ -0,0 +1,83 @@
+# File: neighborhood.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   Example data shared by batched neighborhood scoring (see hillclimb).
+# Notes:
+#   Learners which support batched scoring implement:
+#       neighbor_blocks(data) -> Iterates through (moves, scores) pairs
+#           covering every neighbor in the order neighbors() yields them,
+#           where scores is an array of the score of each move.
+#       apply_move(move) -> Returns the neighbor for a move.
+#   Scores equal those of evaluate_util (or evaluate_maximin when maximin is
+#   set) for the neighbor.
+
+import sys, os
+sys.path.insert(0, os.path.abspath('..'))
+
+import numpy as np
+from utility.batch_eval import example_arrays
+
+class NeighborhoodData:
+    # Precond:
+    #   ex_set is a valid ExampleSet or ArrayExampleSet object.
+    #   domain is a valid Domain object.
+    #   maximin is True to score by the least satisfied agent.
+    #
+    # Postcond:
+    #   Builds the example data: the distinct alternatives of the examples
+    #   (alts, with valid False for those outside the domain), the index of
+    #   each example's alternatives among them (first and second), the
+    #   relation of each example and each example's agent group.
+    def __init__(self, ex_set, domain, maximin=False):
+        alt1, alt2, relation, agent = example_arrays(ex_set)
+        self.domain = domain
+        self.maximin = maximin
+        self.relation = relation
+        self.size = len(relation)
+        alts = np.concatenate([np.asarray(alt1), np.asarray(alt2)]).reshape(2*self.size, -1)
+        inside = domain.contains_array(alts)
+        codes = np.full(len(alts), -1, dtype=np.int64)
+        codes[inside] = domain.encode_array(alts[inside])
+        unique, inverse = np.unique(codes, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        self.valid = unique >= 0
+        self.alts = domain.decode_array(np.maximum(unique, 0))
+        self.first = inverse[:self.size]
+        self.second = inverse[self.size:]
+        agents = list(ex_set.get_agents())
+        self.groups = [np.flatnonzero(agent == agents[i]) for i in range(len(agents))]
+
+    # Precond:
+    #   codes is an (N, K) array of the relation values K models assign to
+    #       the N examples.
+    #
+    # Postcond:
+    #   Returns the (K,) array of the models' scores.
+    def score_codes(self, codes):
+        correct = codes == self.relation[:,None]
+        if not self.maximin:
+            return np.count_nonzero(correct, axis=0)/float(self.size)
+        result = None
+        for rows in self.groups:
+            value = np.count_nonzero(correct[rows], axis=0)/float(len(rows))
+            if result is None:
+                result = value
+            else:
+                result = np.minimum(result, value)
+        return result
+
+    # Precond:
+    #   values is a (U, K) array of a value per distinct alternative for each
+    #       of K models.
+    #   lower is the relation value a model gives a pair whose first
+    #       alternative has the lower value (equal values give equal).
+    #
+    # Postcond:
+    #   Returns the (K,) array of the models' scores.
+    def score_values(self, values, lower):
+        value1 = values[self.first]
+        value2 = values[self.second]
+        codes = np.zeros(value1.shape, dtype=np.int8)
+        codes[value1 < value2] = lower
+        codes[value1 > value2] = -lower
+        return self.score_codes(codes)
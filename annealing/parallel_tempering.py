@@ -0,0 +1,221 @@
+# File: parallel_tempering.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   A replica exchange (parallel tempering) search for preference learners.
+# Notes:
+#   Each replica is a Metropolis chain at a fixed temperature from a ladder,
+#   run in its own process. After every sweep the parent proposes swaps
+#   between replicas at adjacent temperatures, alternating between even and
+#   odd pairs. A swap exchanges the temperatures of the two replicas, so only
+#   a temperature is sent to each worker and learners never move between
+#   processes until the end.
+#   The example set is given to the workers when they start; with the fork
+#   start method it is inherited rather than pickled.
+
+import random
+import multiprocessing as mp
+from math import exp
+from time import time
+from annealing.simulated_annealing import evaluate_util, evaluate_maximin, hillclimb
+from annealing.incremental import incremental_evaluator
+
+class Replica:
+    # Precond:
+    #   learner is a preference representation object implementing
+    #       random_neighbor() and compare(alt1, alt2).
+    #   ex_set is a valid ExampleSet object.
+    #   eval_func is evaluate_util, evaluate_maximin or another function
+    #       which takes a learner and an example set and outputs a numeric
+    #       value to be maximized.
+    #
+    # Postcond:
+    #   Builds a new replica starting from the learner.
+    def __init__(self, learner, ex_set, eval_func):
+        self.ex_set = ex_set
+        self.eval_func = eval_func
+        self.state = None
+        if eval_func is evaluate_util or eval_func is evaluate_maximin:
+            self.state = incremental_evaluator(learner, ex_set, eval_func is evaluate_maximin)
+        self.learner = learner
+        self.current = eval_func(learner, ex_set)
+        self.best = learner
+        self.best_eval = self.current
+
+    # Precond:
+    #   temp is the temperature to run at.
+    #   steps is the number of Metropolis steps to take.
+    #
+    # Postcond:
+    #   Runs the chain and returns the score of its current learner.
+    def run(self, temp, steps):
+        for i in range(steps):
+            neighbor = self.learner.random_neighbor()
+            if self.state is None:
+                eval = self.eval_func(neighbor, self.ex_set)
+            else:
+                eval = self.state.propose(neighbor)
+            accept = eval >= self.current or random.random() <= exp((eval-self.current)/temp)
+            if accept:
+                self.learner = neighbor
+                self.current = eval
+                if eval > self.best_eval:
+                    self.best = neighbor
+                    self.best_eval = eval
+            if self.state is not None:
+                if accept:
+                    self.state.commit()
+                else:
+                    self.state.rollback()
+        return self.current
+
+# Precond:
+#   conn is the worker's end of a Pipe.
+#   learner is the replica's starting learner.
+#   ex_set is a valid ExampleSet object.
+#   eval_func is the function to maximize.
+#   seed is the replica's random seed.
+#
+# Postcond:
+#   Serves commands from the parent until told to stop:
+#       ('run', temp, steps): runs the replica and replies with its score.
+#       ('best',): replies with (best learner, best score).
+#       ('stop',): exits.
+def replica_worker(conn, learner, ex_set, eval_func, seed):
+    random.seed(seed)
+    replica = Replica(learner, ex_set, eval_func)
+    while True:
+        command = conn.recv()
+        if command[0] == 'run':
+            conn.send(replica.run(command[1], command[2]))
+        elif command[0] == 'best':
+            conn.send((replica.best, replica.best_eval))
+        else:
+            break
+    conn.close()
+
+# Precond:
+#   count is the number of temperatures (at least 1).
+#   low is the coldest temperature.
+#   high is the hottest temperature.
+#
+# Postcond:
+#   Returns a list of count temperatures spaced geometrically from low to
+#   high.
+def temperature_ladder(count, low=10**(-4), high=0.05):
+    if count == 1:
+        return [low]
+    return [low*(high/low)**(i/float(count-1)) for i in range(count)]
+
+# Precond:
+#   learners is a list of starting learners, one per replica.
+#   ex_set is a valid ExampleSet object.
+#   eval_func is the function to maximize (evaluate_util or
+#       evaluate_maximin for the incremental path).
+#   temperatures is a list of temperatures, one per replica, or None for
+#       temperature_ladder(len(learners)).
+#   rounds is the number of sweeps between swap proposals.
+#   sweep is the number of steps each replica takes per round.
+#   parallel is True to run each replica in its own process.
+#   time_limit is the number of seconds after which no new round is started,
+#       or None.
+#   max_evals is the largest number of neighbor evaluations of each replica,
+#       or None.
+#   stats is a dictionary to fill with a report of the run, or None.
+#
+# Postcond:
+#   Returns the best learner found by any replica, after a round of hill
+#   climbing.
+#   stats receives the keys rounds (run), swaps (proposed), accepted (swaps),
+#   evaluations (of each replica), time (seconds), score (of the best
+#   learner before hill climbing) and stop (the reason the run ended:
+#   'rounds', 'time' or 'evaluations').
+def learn_PT(learners, ex_set, eval_func=evaluate_util, temperatures=None, rounds=200, sweep=100, parallel=True, time_limit=None, max_evals=None, stats=None):
+    began = time()
+    count = len(learners)
+    if temperatures is None:
+        temperatures = temperature_ladder(count)
+    temperatures = sorted(temperatures)
+    seeds = [random.getrandbits(32) for i in range(count)]
+    conns = []
+    workers = []
+    replicas = []
+    if parallel and count > 1:
+        if 'fork' in mp.get_all_start_methods():
+            context = mp.get_context('fork')
+        else:
+            context = mp.get_context()
+        for i in range(count):
+            parent, child = context.Pipe()
+            worker = context.Process(target=replica_worker, args=(child, learners[i], ex_set, eval_func, seeds[i]))
+            worker.daemon = True
+            worker.start()
+            child.close()
+            conns.append(parent)
+            workers.append(worker)
+    else:
+        replicas = [Replica(learner, ex_set, eval_func) for learner in learners]
+    # level[r] is the index of replica r's temperature.
+    level = list(range(count))
+    proposed = 0
+    accepted = 0
+    evaluations = 0
+    finished = 0
+    reason = 'rounds'
+    try:
+        for round in range(rounds):
+            if max_evals is not None and evaluations >= max_evals:
+                reason = 'evaluations'
+                break
+            if time_limit is not None and time()-began >= time_limit:
+                reason = 'time'
+                break
+            steps = sweep
+            if max_evals is not None:
+                steps = min(steps, max_evals-evaluations)
+            if len(conns) > 0:
+                for r in range(count):
+                    conns[r].send(('run', temperatures[level[r]], steps))
+                scores = [conn.recv() for conn in conns]
+            else:
+                scores = [replicas[r].run(temperatures[level[r]], steps) for r in range(count)]
+            evaluations += steps
+            finished += 1
+            at_level = [0 for i in range(count)]
+            for r in range(count):
+                at_level[level[r]] = r
+            for k in range(round % 2, count-1, 2):
+                cold = at_level[k]
+                hot = at_level[k+1]
+                proposed += 1
+                delta = (scores[hot]-scores[cold])*(1.0/temperatures[k] - 1.0/temperatures[k+1])
+                if delta >= 0 or random.random() <= exp(delta):
+                    level[cold] = k+1
+                    level[hot] = k
+                    accepted += 1
+        if len(conns) > 0:
+            for conn in conns:
+                conn.send(('best',))
+            results = [conn.recv() for conn in conns]
+        else:
+            results = [(replica.best, replica.best_eval) for replica in replicas]
+    finally:
+        for conn in conns:
+            try:
+                conn.send(('stop',))
+            except (OSError, ValueError):
+                pass
+        for worker in workers:
+            worker.join()
+    best = 0
+    for i in range(1,len(results)):
+        if results[i][1] > results[best][1]:
+            best = i
+    if stats is not None:
+        stats['rounds'] = finished
+        stats['swaps'] = proposed
+        stats['accepted'] = accepted
+        stats['evaluations'] = evaluations
+        stats['time'] = time()-began
+        stats['score'] = results[best][1]
+        stats['stop'] = reason
+    return hillclimb(results[best][0], ex_set, eval_func)
@@ -0,0 +1,94 @@
+# File: racing.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   Races random-restart hill climbing runs on growing subsets of the
+#   examples, so hopeless restarts are discarded before they are climbed on
+#   the whole example set.
+# Notes:
+#   Every round climbs the surviving learners on a random subset of the
+#   examples, each subset containing the previous one and eta times larger,
+#   with the last being the whole set. After a round, learners whose score
+#   is below the best one's by more than two Hoeffding radii are dropped
+#   (racing), and of the rest only the best 1/eta are kept (successive
+#   halving). Only survivors of the last round are climbed to completion on
+#   all examples; dropped learners are discarded, so a race reports fewer
+#   local maxima than it has restarts, and those it reports are the most
+#   promising ones.
+#   The example set must support subset(rows) (see ArrayExampleSet).
+
+import random
+from math import log, sqrt, ceil
+import numpy as np
+from annealing.simulated_annealing import evaluate_util, evaluate_maximin, hillclimb_scored
+
+# Precond:
+#   n is the number of examples a proportion is measured on (at least 1).
+#   delta is the probability with which the bound may fail.
+#
+# Postcond:
+#   Returns the Hoeffding radius of a proportion measured on n examples: the
+#   true proportion is within the radius with probability 1-delta.
+def hoeffding_radius(n, delta):
+    return sqrt(log(2.0/delta)/(2.0*n))
+
+# Precond:
+#   size is the number of examples (at least 1).
+#   eta is the growth factor between rounds (at least 2).
+#   smallest is the fewest examples to race on.
+#
+# Postcond:
+#   Returns the increasing list of subset sizes, ending with size.
+def race_sizes(size, eta=2, smallest=100):
+    sizes = [size]
+    while sizes[0]//eta >= smallest:
+        sizes.insert(0, sizes[0]//eta)
+    return sizes
+
+# Precond:
+#   learners is a list of starting learners implementing neighbors().
+#   ex_set is a valid ArrayExampleSet object.
+#   eval_func is evaluate_util or evaluate_maximin.
+#   delta is the failure probability of each confidence bound.
+#   eta is the growth factor of the subsets and the reduction factor of the
+#       survivors in each round.
+#   smallest is the fewest examples to race on.
+#   cache is an EvalCache object for ex_set, or None. It is only used on the
+#       whole example set.
+#   stats is a dictionary to fill with a report of the race, or None.
+#
+# Postcond:
+#   Returns a list of (learner, score) pairs, one per learner surviving the
+#   race in the order of the starting learners, giving the local maximum of
+#   the whole example set it ended on and its score.
+#   stats receives the keys sizes (the subset size of each round) and alive
+#   (the number of learners still racing in each round, the last being the
+#   number of pairs returned).
+def race_restarts(learners, ex_set, eval_func=evaluate_util, delta=0.05, eta=2, smallest=100, cache=None, stats=None):
+    size = len(ex_set)
+    sizes = race_sizes(size, eta, smallest)
+    order = np.array(random.sample(range(size), size), dtype=np.int64)
+    current = list(learners)
+    alive = list(range(len(current)))
+    climbed = []
+    for round in range(len(sizes)):
+        climbed.append(len(alive))
+        if sizes[round] == size:
+            break
+        subset = ex_set.subset(np.sort(order[:sizes[round]]))
+        scores = {}
+        for i in alive:
+            current[i], scores[i] = hillclimb_scored(current[i], subset, eval_func)
+        if eval_func is evaluate_maximin:
+            n = min([subset.agent_count(agent) for agent in subset.get_agents()])
+        else:
+            n = len(subset)
+        radius = hoeffding_radius(max(n, 1), delta)
+        best = max(scores.values())
+        alive = [i for i in alive if scores[i] + 2*radius >= best]
+        # Stable sort, so ties go to the earlier restart.
+        alive.sort(key=lambda i: -scores[i])
+        alive = sorted(alive[:int(ceil(len(alive)/float(eta)))])
+    if stats is not None:
+        stats['sizes'] = sizes[:len(climbed)]
+        stats['alive'] = climbed
+    return [hillclimb_scored(current[i], ex_set, eval_func, cache=cache) for i in alive]
@@ -6,6 +6,11 @@
 
 from random import random
 from math import exp
+from time import time
+import numpy as np
+from utility.batch_eval import example_agreement
+from annealing.incremental import incremental_evaluator
+from annealing.neighborhood import NeighborhoodData
 
 # Precond:
 #   learner is a preference represntation object implementing the following methods:
@@ -14,7 +19,11 @@ from math import exp
 #
 # Postcond:
 #   Returns the proportion of examples satisfied by the learner in the example set.
+#   Learners with a compare_batch method are evaluated on all examples at once.
 def evaluate_util(learner, ex_set):
+    if hasattr(learner, 'compare_batch'):
+        correct, _ = example_agreement(learner, ex_set)
+        return int(np.count_nonzero(correct))/float(len(ex_set))
     correct = 0
     for ex in ex_set.each():
         alts = ex.get_alts()
@@ -34,10 +43,15 @@ def evaluate_maximin(learner, ex_set):
     correct = {}
     for agent in ex_set.get_agents():
         correct[agent] = 0
-    for ex in ex_set.example_list():
-        alts = ex.get_alts()
-        if learner.compare(alts[0],alts[1]) == ex.get_relation():
-            correct[ex.get_agent()] += 1
+    if hasattr(learner, 'compare_batch'):
+        matches, agent_ids = example_agreement(learner, ex_set)
+        for agent in correct:
+            correct[agent] = int(np.count_nonzero(matches[agent_ids == agent]))
+    else:
+        for ex in ex_set.example_list():
+            alts = ex.get_alts()
+            if learner.compare(alts[0],alts[1]) == ex.get_relation():
+                correct[ex.get_agent()] += 1
     min = None
     for agent in correct.keys():
         correct[agent] = correct[agent]/ex_set.agent_count(agent)
@@ -45,33 +59,239 @@ def evaluate_maximin(learner, ex_set):
             min = correct[agent]
     return min
 
+class GeometricCooling:
+    # Precond:
+    #   start is the starting temperature.
+    #   cool is the cooling rate: each step divides the temperature by 1+cool.
+    #   stop is the temperature at which the search is frozen.
+    #
+    # Postcond:
+    #   Builds a new geometric cooling schedule.
+    def __init__(self, start=100, cool=0.001, stop=10**(-6)):
+        self.start = start
+        self.cool = cool
+        self.stop = stop
+        self.reset()
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Restarts the schedule at its starting temperature.
+    def reset(self):
+        self.temp = self.start
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the current temperature.
+    def temperature(self):
+        return self.temp
+
+    # Precond:
+    #   accepted is True if the last neighbor was accepted.
+    #
+    # Postcond:
+    #   Advances the schedule by one step.
+    def update(self, accepted):
+        self.temp = self.temp/(1.0+self.cool)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns True when the schedule has finished.
+    def frozen(self):
+        return not self.temp > self.stop
+
+class LundyMeesCooling(GeometricCooling):
+    # Precond:
+    #   start is the starting temperature.
+    #   stop is the temperature at which the search is frozen.
+    #   iterations is the number of steps to go from start to stop.
+    #
+    # Postcond:
+    #   Builds a new Lundy-Mees cooling schedule, where each step sets the
+    #   temperature t to t/(1+beta*t).
+    def __init__(self, start=100, stop=10**(-6), iterations=18420):
+        self.beta = (1.0/stop - 1.0/start)/iterations
+        GeometricCooling.__init__(self, start, 0, stop)
+
+    # Precond:
+    #   accepted is True if the last neighbor was accepted.
+    #
+    # Postcond:
+    #   Advances the schedule by one step.
+    def update(self, accepted):
+        self.temp = self.temp/(1.0+self.beta*self.temp)
+
+class AdaptiveCooling(GeometricCooling):
+    # Precond:
+    #   start is the starting temperature.
+    #   stop is the temperature the geometric part of the schedule reaches
+    #       after the given number of iterations.
+    #   iterations is the number of steps in the schedule.
+    #   high is the target acceptance rate at the start.
+    #   low is the target acceptance rate at the end.
+    #   window is the number of steps between adjustments.
+    #   step is the factor the temperature is multiplied by when too many
+    #       neighbors are accepted (and divided by when too few are).
+    #
+    # Postcond:
+    #   Builds a new adaptive cooling schedule: geometric cooling which is
+    #   corrected every window steps towards a target acceptance rate falling
+    #   geometrically from high to low.
+    def __init__(self, start=100, stop=10**(-6), iterations=18420, high=0.5, low=0.01, window=100, step=0.8):
+        self.iterations = iterations
+        self.high = high
+        self.low = low
+        self.window = window
+        self.step = step
+        self.factor = (float(stop)/start)**(1.0/iterations)
+        GeometricCooling.__init__(self, start, 0, stop)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Restarts the schedule at its starting temperature.
+    def reset(self):
+        self.temp = self.start
+        self.iteration = 0
+        self.accepted = 0
+
+    # Precond:
+    #   accepted is True if the last neighbor was accepted.
+    #
+    # Postcond:
+    #   Advances the schedule by one step.
+    def update(self, accepted):
+        self.temp *= self.factor
+        self.iteration += 1
+        if accepted:
+            self.accepted += 1
+        if self.iteration % self.window == 0:
+            rate = self.accepted/float(self.window)
+            target = self.high*(self.low/self.high)**(self.iteration/float(self.iterations))
+            if rate > target:
+                self.temp *= self.step
+            elif rate < target:
+                self.temp /= self.step
+            self.accepted = 0
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns True when the schedule has finished.
+    def frozen(self):
+        return self.iteration >= self.iterations
+
+# Precond:
+#   name is one of 'geometric', 'lundy-mees' or 'adaptive'.
+#
+# Postcond:
+#   Returns a new cooling schedule of the named kind with default settings.
+def cooling_schedule(name):
+    if name == 'lundy-mees':
+        return LundyMeesCooling()
+    if name == 'adaptive':
+        return AdaptiveCooling()
+    return GeometricCooling()
+
 # Precond:
 #   learner is a preference represntation object implementing the following methods:
-#       1) neighbors(self) -> Iterates through all neighbors of the learner.
 #       2) random_neighbor(self) -> Returns a random neighbor of the learner.
 #       3) compare(self, alt1, alt2) -> Returns the relation between alt1 and alt2.
 #   ex_set is a valid ExampleSet object.
+#   eval_func is a function which takes a learner and an example set and
+#       outputs a numeric value to be maximized.
+#   schedule is a cooling schedule object, or None for the default
+#       geometric schedule.
+#   time_limit is the number of seconds after which to stop, or None.
+#   max_evals is the number of neighbor evaluations after which to stop, or
+#       None.
+#   patience is the number of steps in a row without an improving move after
+#       which to stop, or None. In the hot phase improving moves are common,
+#       so this only ends runs once they have frozen.
+#   stats is a dictionary to fill with a report of the run, or None.
 #
 # Postcond:
-#   Returns a modified learner which has been processed through an implementation
-#   of simulated annealing and then a round of hill climbing.
-def learn_SA(learner, ex_set):
-    current_eval = evaluate_util(learner, ex_set)
-    temp = 100
-    cool = 0.001
-    while temp > 10**(-6):
+#   Returns the learner the annealing run ends on.
+#   stats receives the keys iterations, evaluations, time (seconds), score
+#   (of the returned learner) and stop (the reason the run ended: 'frozen',
+#   'time', 'evaluations' or 'patience').
+def anneal(learner, ex_set, eval_func=evaluate_util, schedule=None, time_limit=None, max_evals=None, patience=None, stats=None):
+    began = time()
+    if schedule is None:
+        schedule = GeometricCooling()
+    schedule.reset()
+    state = None
+    if eval_func is evaluate_util or eval_func is evaluate_maximin:
+        state = incremental_evaluator(learner, ex_set, eval_func is evaluate_maximin)
+    current_eval = eval_func(learner, ex_set)
+    since_improved = 0
+    iterations = 0
+    reason = 'frozen'
+    while not schedule.frozen():
+        if max_evals is not None and iterations >= max_evals:
+            reason = 'evaluations'
+            break
+        if time_limit is not None and time()-began >= time_limit:
+            reason = 'time'
+            break
+        if patience is not None and since_improved >= patience:
+            reason = 'patience'
+            break
         neighbor = learner.random_neighbor()
-        eval = evaluate_util(neighbor, ex_set)
+        if state is None:
+            eval = eval_func(neighbor, ex_set)
+        else:
+            eval = state.propose(neighbor)
+        iterations += 1
+        accept = False
         if eval > current_eval:
-            current_eval = eval
-            learner = neighbor
+            accept = True
+            since_improved = 0
         else:
+            since_improved += 1
             delta = eval - current_eval
-            prob = exp(delta/temp)
+            prob = exp(delta/schedule.temperature())
             if random() <= prob:
-                learner = neighbor
-                current_eval = eval
-        temp = temp/(1.0+cool)
+                accept = True
+        if accept:
+            learner = neighbor
+            current_eval = eval
+        if state is not None:
+            if accept:
+                state.commit()
+            else:
+                state.rollback()
+        schedule.update(accept)
+    if stats is not None:
+        stats['iterations'] = iterations
+        stats['evaluations'] = iterations
+        stats['time'] = time()-began
+        stats['score'] = current_eval
+        stats['stop'] = reason
+    return learner
+
+# Precond:
+#   learner is a preference represntation object implementing the following methods:
+#       1) neighbors(self) -> Iterates through all neighbors of the learner.
+#       2) random_neighbor(self) -> Returns a random neighbor of the learner.
+#       3) compare(self, alt1, alt2) -> Returns the relation between alt1 and alt2.
+#   ex_set is a valid ExampleSet object.
+#   The remaining arguments are as for anneal.
+#
+# Postcond:
+#   Returns a modified learner which has been processed through an implementation
+#   of simulated annealing and then a round of hill climbing.
+#   Learners with an incremental evaluator (see incremental.py) only re-score
+#   the examples each neighbor's move affects.
+def learn_SA(learner, ex_set, schedule=None, time_limit=None, max_evals=None, patience=None, stats=None):
+    learner = anneal(learner, ex_set, evaluate_util, schedule, time_limit, max_evals, patience, stats)
     return hillclimb(learner,ex_set)
 
 # Precond:
@@ -80,27 +300,13 @@ def learn_SA(learner, ex_set):
 #       2) random_neighbor(self) -> Returns a random neighbor of the learner.
 #       3) compare(self, alt1, alt2) -> Returns the relation between alt1 and alt2.
 #   ex_set is a valid ExampleSet object.
+#   The remaining arguments are as for anneal.
 #
 # Postcond:
 #   Returns a modified learner which has been processed through an implementation
 #   of simulated annealing and then a round of hill climbing.
-def learn_SA_mm(learner, ex_set):
-    current_eval = evaluate_maximin(learner, ex_set)
-    temp = 100
-    cool = 0.001
-    while temp > 10**(-6):
-        neighbor = learner.random_neighbor()
-        eval = evaluate_maximin(neighbor, ex_set)
-        if eval > current_eval:
-            current_eval = eval
-            learner = neighbor
-        else:
-            delta = eval - current_eval
-            prob = exp(delta/temp)
-            if random() <= prob:
-                learner = neighbor
-                current_eval = eval
-        temp = temp/(1.0+cool)
+def learn_SA_mm(learner, ex_set, schedule=None, time_limit=None, max_evals=None, patience=None, stats=None):
+    learner = anneal(learner, ex_set, evaluate_maximin, schedule, time_limit, max_evals, patience, stats)
     return hillclimb(learner,ex_set, evaluate_maximin)
 
 # Precond:
@@ -110,20 +316,119 @@ def learn_SA_mm(learner, ex_set):
 #   ex_set is a valid ExampleSet object.
 #   eval_func is a function which takes a learner and an example set and
 #       outputs a numeric value to be maximized.
+#   first_improvement is True to move to the first improving neighbor found
+#       rather than the best one.
+#   cache is an EvalCache object (see utility/eval_cache.py) for ex_set to
+#       look up and record scores in, or None.
 #
 # Postcond:
 #   Returns a modified learner which has been processed through an implementation
-#   of hill climbing.
-def hillclimb(learner, ex_set, eval_func=evaluate_util):
+#   of hill climbing: the learner repeatedly moves to its best (or first)
+#   improving neighbor until it has none.
+def hillclimb(learner, ex_set, eval_func=evaluate_util, first_improvement=False, cache=None):
+    return hillclimb_scored(learner, ex_set, eval_func, first_improvement, cache)[0]
+
+# Precond:
+#   As for hillclimb.
+#
+# Postcond:
+#   Returns the pair (learner, score) of the learner hillclimb returns and its
+#   score.
+#   Learners with a neighbor_blocks method (see neighborhood.py) score their
+#   neighborhood in batches when eval_func is evaluate_util or
+#   evaluate_maximin.
+#   With a cache, every learner the climb passes through is first looked up
+#   among the climbs of the cache, ending the climb on a hit, and the climb's
+#   outcome is recorded for all of them at the end. Neighbors are scored
+#   through the cache.
+def hillclimb_scored(learner, ex_set, eval_func=evaluate_util, first_improvement=False, cache=None):
+    if hasattr(learner, 'neighbor_blocks') and (eval_func is evaluate_util or eval_func is evaluate_maximin):
+        return hillclimb_batch(learner, ex_set, eval_func, first_improvement, cache)
+    if cache is not None:
+        score = lambda x: cache.evaluate(x, ex_set, eval_func)
+    else:
+        score = lambda x: eval_func(x, ex_set)
+    path = []
     best = learner
-    best_eval = eval_func(learner, ex_set)
-    improved = True
-    while improved:
+    best_eval = None
+    while True:
+        if cache is not None:
+            result = cache.climb(best, eval_func, first_improvement)
+            if result is not None:
+                break
+        if best_eval is None:
+            best_eval = score(best)
+        path.append(best)
         improved = False
-        for neighbor in learner.neighbors():
-            eval = eval_func(neighbor, ex_set)
+        for neighbor in best.neighbors():
+            eval = score(neighbor)
             if eval > best_eval:
                 improved = True
                 best = neighbor
                 best_eval = eval
-    return learner
+                if first_improvement:
+                    break
+        if not improved:
+            result = (best, best_eval)
+            break
+    if cache is not None:
+        cache.put_climb(path, eval_func, first_improvement, result)
+    return result
+
+# Precond:
+#   learner is a preference represntation object implementing
+#       neighbor_blocks(data) and apply_move(move) (see neighborhood.py).
+#   ex_set is a valid ExampleSet object.
+#   eval_func is evaluate_util or evaluate_maximin.
+#   first_improvement is True to move to the first improving neighbor found
+#       rather than the best one.
+#   cache is an EvalCache object for ex_set, or None. Climbs are looked up
+#       and recorded as in hillclimb_scored; the starting learner's score is
+#       looked up and that of each neighbor moved to recorded.
+#
+# Postcond:
+#   Returns the pair hillclimb_scored would return, scoring each neighborhood
+#   through the learner's neighbor blocks.
+def hillclimb_batch(learner, ex_set, eval_func=evaluate_util, first_improvement=False, cache=None):
+    data = None
+    path = []
+    current_eval = None
+    while True:
+        if cache is not None:
+            result = cache.climb(learner, eval_func, first_improvement)
+            if result is not None:
+                break
+        if current_eval is None:
+            if cache is not None:
+                current_eval = cache.evaluate(learner, ex_set, eval_func)
+            else:
+                current_eval = eval_func(learner, ex_set)
+        if data is None:
+            data = NeighborhoodData(ex_set, learner.domain, eval_func is evaluate_maximin)
+        path.append(learner)
+        best_move = None
+        best_eval = current_eval
+        for moves, scores in learner.neighbor_blocks(data):
+            if len(moves) == 0:
+                continue
+            if first_improvement:
+                better = np.flatnonzero(scores > current_eval)
+                if len(better) > 0:
+                    best_move = moves[better[0]]
+                    best_eval = float(scores[better[0]])
+                    break
+            else:
+                i = int(np.argmax(scores))
+                if scores[i] > best_eval:
+                    best_move = moves[i]
+                    best_eval = float(scores[i])
+        if best_move is None:
+            result = (learner, current_eval)
+            break
+        learner = learner.apply_move(best_move)
+        current_eval = best_eval
+        if cache is not None:
+            cache.put(learner, eval_func, current_eval)
+    if cache is not None:
+        cache.put_climb(path, eval_func, first_improvement, result)
+    return result
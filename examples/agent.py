@@ -5,10 +5,17 @@
 #   Defines an example generating agent.
 # Notes:
 
+import sys, os
+sys.path.insert(0, os.path.abspath('..'))
+
 from .example import Example
+from utility.batch_eval import relation_codes, domain_relation_codes
 
 class Agent:
     nextID = 1
+    # TruthCache shared by all agents, or None to keep ground truth in memory
+    # only.
+    truth_cache = None
     # Precond:
     #   model is an object which has the following methods:
     #       compare(obj1: Alternative, obj2: Alternative): Relation.
@@ -22,6 +29,7 @@ class Agent:
         Agent.nextID += 1
         self.model = model
         self.domain = domain
+        self.truth = None
 
     # Precond:
     #   alt1 is a valid Alternative object.
@@ -33,6 +41,34 @@ class Agent:
         relation = self.model.compare(alt1,alt2)
         return Example(alt1,alt2,relation,self.domain,self.id)
 
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Returns an (N,) int8 array of the relation values the agent's model
+    #   assigns to each pair.
+    def label_pairs(self, alt1, alt2):
+        return relation_codes(self.model, alt1, alt2, self.domain)
+
+    # Precond:
+    #   The agent has a domain.
+    #
+    # Postcond:
+    #   Returns the int8 array of the agent's relation values for every pair
+    #   of the domain, indexed by pair index (see Domain.pair_rank).
+    #   The array is computed on the first call and reused afterwards.
+    #   When Agent.truth_cache is set the array is read from (or written to)
+    #   the cache and is read-only.
+    def ground_truth(self):
+        if self.truth is None:
+            compute = lambda: domain_relation_codes(self.model, self.domain)
+            if Agent.truth_cache is None:
+                self.truth = compute()
+            else:
+                self.truth = Agent.truth_cache.fetch(self, compute)
+        return self.truth
+
     # Precond:
     #   None.
     #
@@ -5,9 +5,16 @@
 #   Defines an alternative from a specified combinatorial domain.
 # Notes:
 #   Alternative attribute values begin with 1, not 0.
+#   An alternative caches its mixed-radix code (see Domain.encode) once it is
+#   computed; changing a value clears the cache.
+#   An alternative also remembers the domain it was last validated against
+#   (trusted), so repeated matches() calls with that domain are O(1).
+#   Alternatives built by a Domain start out trusted by it.
 
 
 class Alternative:
+    __slots__ = ('values', 'domain', 'cached_code', 'trusted')
+
     # Precond:
     #   values is a list of integers represent the values of attributes in the
     #       alternative.
@@ -17,8 +24,10 @@ class Alternative:
     #   Builds a new Alternative object with the specified domain and attribute
     #   values.
     def __init__(self, values, domain=None):
-        self.values = values[:]
+        self.values = list(values)
         self.domain = domain
+        self.cached_code = None
+        self.trusted = None
 
     # Precond:
     #   index is an integer representing the attribute index.
@@ -37,8 +46,24 @@ class Alternative:
     #   Returns the new value at that index.
     def set(self, index, value):
         self.values[index] = value
+        self.cached_code = None
+        self.trusted = None
         return self.values[index]
 
+    # Precond:
+    #   The alternative has a domain, or domain is a valid Domain object.
+    #
+    # Postcond:
+    #   Returns the integer code of the alternative in the domain.
+    #   The code is cached when it is computed against the alternative's own
+    #   domain.
+    def code(self, domain=None):
+        if domain is None or domain is self.domain:
+            if self.cached_code is None:
+                self.cached_code = self.domain.encode(self)
+            return self.cached_code
+        return domain.encode(self)
+
     # Precond:
     #   domain is a valid Domain object, or None.
     #
@@ -46,9 +71,12 @@ class Alternative:
     #   Return true if the alternative fits the provided domain.
     #   If the domain fits and the domain field is None then the alternative
     #   sets its domain field to the given domain.
+    #   Alternatives already validated against the domain are not rechecked.
     def matches(self, domain):
         if domain is None:
             return False
+        if self.trusted is domain:
+            return True
         if domain.length() != len(self.values):
             return False
         for i in range(domain.length()):
@@ -56,6 +84,8 @@ class Alternative:
                 return False
         if self.domain is None:
             self.domain = domain
+            self.cached_code = None
+        self.trusted = domain
         return True
 
     # Precond:
@@ -94,6 +124,13 @@ class Alternative:
                 return False
         return True
 
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns a hash of the alternative consistent with __eq__.
+    def __hash__(self):
+        return hash(tuple(self.values))
 
     # Precond:
     #   None.
@@ -0,0 +1,407 @@
+# File: array_example_set.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   Defines a columnar, NumPy backed, example set.
+# Notes:
+#   Stores every example as a row over four columns:
+#       alts:     (n, 2, attributes) integer matrix holding alt1 and alt2.
+#       relation: (n,) int8 column holding the relation value.
+#       agent:    (n,) int32 column holding the agent ID (0 for no agent).
+#       flagged:  (n,) boolean column holding the example flags.
+#       trusted:  (n,) boolean column, True when both alternatives were found
+#                 to fit the set's domain when the example was added.
+#   Examples handed out by the set are light views built on demand; flagging
+#   a view writes through to the flagged column. Alternatives of trusted
+#   rows are handed out already validated against the domain.
+#   Rows are kept clumped by agent (in the order agents were first seen),
+#   which is the order ExampleSet iterates in.
+
+from random import getrandbits
+from torch.utils.data import Dataset
+import numpy as np
+import torch
+from .alternative import Alternative
+from .example import Example
+from .relation import Relation
+
+class ArrayExample(Example):
+    # Precond:
+    #   ex_set is a valid ArrayExampleSet object.
+    #   row is the row index of the example in ex_set.
+    #
+    # Postcond:
+    #   Builds a new Example object which views a row of an ArrayExampleSet.
+    def __init__(self, ex_set, row):
+        alts = ex_set.alts[row]
+        agent = int(ex_set.agent[row])
+        if agent == 0:
+            agent = None
+        alt1 = Alternative(alts[0].tolist(), ex_set.domain)
+        alt2 = Alternative(alts[1].tolist(), ex_set.domain)
+        if ex_set.trusted[row]:
+            alt1.trusted = ex_set.domain
+            alt2.trusted = ex_set.domain
+        Example.__init__(self, alt1, alt2, Relation(int(ex_set.relation[row])), ex_set.domain, agent)
+        self.ex_set = ex_set
+        self.row = row
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns True if the example has been flagged.
+    def is_flagged(self):
+        return bool(self.ex_set.flagged[self.row])
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Flags the example.
+    def flag(self):
+        self.ex_set.flagged[self.row] = True
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Unflags the example.
+    def unflag(self):
+        self.ex_set.flagged[self.row] = False
+
+class ArrayExampleSet(Dataset):
+    # Precond:
+    #   domain is a valid Domain object or None.
+    #   capacity is the number of rows to initially reserve.
+    #
+    # Postcond:
+    #   Builds a new empty ArrayExampleSet object.
+    def __init__(self, domain=None, capacity=64):
+        self.domain = domain
+        self.size = 0
+        self.capacity = max(1,capacity)
+        self.alts = None
+        self.relation = np.zeros(self.capacity, dtype=np.int8)
+        self.agent = np.zeros(self.capacity, dtype=np.int32)
+        self.flagged = np.zeros(self.capacity, dtype=bool)
+        self.trusted = np.zeros(self.capacity, dtype=bool)
+        self.agents = []
+        if domain is not None:
+            self._allocate(domain.length())
+
+    # Precond:
+    #   width is the number of attributes of each alternative.
+    #
+    # Postcond:
+    #   Allocates the alternative matrix.
+    def _allocate(self, width):
+        self.alts = np.zeros((self.capacity,2,width), dtype=np.int32)
+
+    # Precond:
+    #   needed is the number of rows about to be added.
+    #
+    # Postcond:
+    #   Grows the columns (by doubling) so that needed more rows fit.
+    def _reserve(self, needed):
+        if self.size + needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while self.size + needed > capacity:
+            capacity *= 2
+        self.alts = self._grow(self.alts, capacity)
+        self.relation = self._grow(self.relation, capacity)
+        self.agent = self._grow(self.agent, capacity)
+        self.flagged = self._grow(self.flagged, capacity)
+        self.trusted = self._grow(self.trusted, capacity)
+        self.capacity = capacity
+
+    @staticmethod
+    def _grow(column, capacity):
+        result = np.zeros((capacity,)+column.shape[1:], dtype=column.dtype)
+        result[:len(column)] = column
+        return result
+
+    # Precond:
+    #   agent is an agent ID integer (0 for no agent).
+    #
+    # Postcond:
+    #   Returns the row index at which the next example for the agent should
+    #   be placed to keep rows clumped by agent, opening a gap if needed.
+    def _slot(self, agent):
+        if agent not in self.agents:
+            self.agents.append(agent)
+            return self.size
+        if agent == self.agents[-1]:
+            return self.size
+        # Insert at the end of the agent's clump.
+        pos = self.agents.index(agent)
+        later = np.isin(self.agent[:self.size], self.agents[pos+1:])
+        slot = int(np.argmax(later))
+        for column in [self.alts, self.relation, self.agent, self.flagged, self.trusted]:
+            column[slot+1:self.size+1] = column[slot:self.size].copy()
+        return slot
+
+    # Precond:
+    #   example is a valid Example object.
+    #
+    # Postcond:
+    #   Files the example away based on the agent ID in the example.
+    #   If there is no agent ID in the example the example is filed under
+    #   agent 0.
+    def add_example(self, example):
+        alts = example.get_alts()
+        if self.alts is None:
+            self._allocate(alts[0].length())
+        if self.domain is None:
+            self.domain = example.get_domain()
+        self._reserve(1)
+        agent = example.get_agent()
+        if agent is None:
+            agent = 0
+        row = self._slot(agent)
+        self.alts[row,0] = alts[0].values
+        self.alts[row,1] = alts[1].values
+        self.relation[row] = example.get_relation().value
+        self.agent[row] = agent
+        self.flagged[row] = example.is_flagged()
+        self.trusted[row] = alts[0].matches(self.domain) and alts[1].matches(self.domain)
+        self.size += 1
+
+    # Precond:
+    #   examples is a list of valid Example objects.
+    #
+    # Postcond:
+    #   Files each example away based on the agent ID in the example.
+    def add_example_list(self, examples):
+        for example in examples:
+            self.add_example(example)
+
+    # Precond:
+    #   alt1 is an (n, attributes) integer array of alternatives.
+    #   alt2 is an (n, attributes) integer array of alternatives.
+    #   relation is an (n,) integer array of relation values.
+    #   agent is an agent ID integer, or None.
+    #
+    # Postcond:
+    #   Files all n examples away under the given agent in one step.
+    def add_arrays(self, alt1, alt2, relation, agent=None):
+        n = len(relation)
+        if n == 0:
+            return
+        if self.alts is None:
+            self._allocate(np.shape(alt1)[1])
+        if agent is None:
+            agent = 0
+        self._reserve(n)
+        trusted = np.zeros(n, dtype=bool)
+        if self.domain is not None:
+            trusted = self.domain.contains_array(alt1) & self.domain.contains_array(alt2)
+        if agent in self.agents and agent != self.agents[-1]:
+            # Fall back on the row at a time path to keep agents clumped.
+            for i in range(n):
+                row = self._slot(agent)
+                self.alts[row,0] = alt1[i]
+                self.alts[row,1] = alt2[i]
+                self.relation[row] = relation[i]
+                self.agent[row] = agent
+                self.flagged[row] = False
+                self.trusted[row] = trusted[i]
+                self.size += 1
+            return
+        if agent not in self.agents:
+            self.agents.append(agent)
+        rows = slice(self.size,self.size+n)
+        self.alts[rows,0] = alt1
+        self.alts[rows,1] = alt2
+        self.relation[rows] = relation
+        self.agent[rows] = agent
+        self.flagged[rows] = False
+        self.trusted[rows] = trusted
+        self.size += n
+
+    # Precond:
+    #   rows is an integer array of row indices.
+    #
+    # Postcond:
+    #   Returns a new ArrayExampleSet holding copies of the given rows.
+    def subset(self, rows):
+        n = len(rows)
+        result = ArrayExampleSet(self.domain, n)
+        if self.alts is None:
+            return result
+        if result.alts is None:
+            result._allocate(self.alts.shape[2])
+        result.alts[:n] = self.alts[rows]
+        result.relation[:n] = self.relation[rows]
+        result.agent[:n] = self.agent[rows]
+        result.flagged[:n] = self.flagged[rows]
+        result.trusted[:n] = self.trusted[rows]
+        result.size = n
+        present = set(np.unique(result.agent[:n]).tolist())
+        result.agents = [a for a in self.agents if a in present]
+        return result
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the tuple (alt1, alt2, relation, agent) of column views,
+    #   trimmed to the number of examples.
+    def as_arrays(self):
+        if self.alts is None:
+            empty = np.zeros((0,0), dtype=np.int32)
+            return (empty, empty, self.relation[:0], self.agent[:0])
+        return (self.alts[:self.size,0], self.alts[:self.size,1],
+                self.relation[:self.size], self.agent[:self.size])
+
+    # Precond:
+    #   agent is an agent ID integer.
+    #
+    # Postcond:
+    #   Returns the row indices of the agent's examples.
+    def agent_rows(self, agent):
+        return np.flatnonzero(self.agent[:self.size] == agent)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the agents who have examples in the example set.
+    def get_agents(self):
+        return list(self.agents)
+
+    # Precond:
+    #   agent is the agent's ID.
+    #
+    # Postcond:
+    #   Returns the number of examples from the agent.
+    def agent_count(self, agent):
+        return int(np.count_nonzero(self.agent[:self.size] == agent))
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns a single list with all examples.
+    def example_list(self):
+        return list(self.each())
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Shuffles the rows, internally, per agent ID
+    def shuffle(self):
+        rng = np.random.default_rng(getrandbits(64))
+        for agent in self.agents:
+            rows = self.agent_rows(agent)
+            perm = rows[rng.permutation(len(rows))]
+            self.alts[rows] = self.alts[perm]
+            self.relation[rows] = self.relation[perm]
+            self.flagged[rows] = self.flagged[perm]
+            self.trusted[rows] = self.trusted[perm]
+
+    # Precond:
+    #   row is a row index.
+    #
+    # Postcond:
+    #   Turns a row into a structure which can be used for learning a neural
+    #   network.
+    def prepare_row(self, row):
+        inp = torch.from_numpy(self.alts[row].reshape(-1).astype(np.float32))
+        label = torch.tensor(int(self.relation[row]) + 2)
+        return (inp,label)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Iterates through each examples (clumped by agent.)
+    def each(self):
+        for row in range(self.size):
+            yield ArrayExample(self, row)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Iterates through each flagged examples (clumped by agent.)
+    def each_flagged(self):
+        for row in np.flatnonzero(self.flagged[:self.size]):
+            yield ArrayExample(self, int(row))
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Iterates through each unflagged examples (clumped by agent.)
+    #   Flags set during iteration are respected.
+    def each_unflagged(self):
+        for row in range(self.size):
+            if not self.flagged[row]:
+                yield ArrayExample(self, row)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Unflags all examples.
+    def unflag_all(self):
+        self.flagged[:] = False
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the total number of examples in the set.
+    def __len__(self):
+        return self.size
+
+    # Precond:
+    #   i is the index of the example ot retrieve.
+    #
+    # Postcond:
+    #   Returns the ith example prepared for a neural network.
+    def __getitem__(self,i):
+        if i < 0 or i >= self.size:
+            return None
+        return self.prepare_row(i)
+
+    # Precond:
+    #   i is the index of the example ot retrieve.
+    #
+    # Postcond:
+    #   Returns the ith example
+    def get(self,i):
+        if i < 0 or i >= self.size:
+            return None
+        return ArrayExample(self, i)
+
+    # Precond:
+    #   n is an integer representing the number of folds.
+    #
+    # Postcond:
+    #   Returns an iterator which returns test and validation set.
+    def crossvalidation(self,n):
+        self.shuffle()
+        groups = [self.agent_rows(agent) for agent in self.agents]
+        for i in range(n):
+            train = []
+            valid = []
+            for rows in groups:
+                count = int(len(rows)/n)
+                train.append(rows[0:count*i])
+                valid.append(rows[count*i:count+(count*i)])
+                train.append(rows[count+(count*i):])
+            # Rows before and after the slice sit next to each other, so the
+            # training rows stay clumped by agent.
+            train = self.subset(np.concatenate([[]]+train).astype(np.intp))
+            valid = self.subset(np.concatenate([[]]+valid).astype(np.intp))
+            yield (train,valid)
+            del train
+            del valid
+
+    def __str__(self):
+        ex = self.example_list()
+        ex = list(map(lambda x: str(x),ex))
+        return "\n".join(ex)
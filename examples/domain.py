@@ -4,10 +4,16 @@
 # Purpose:
 #   Defines a combinatorial domain.
 # Notes:
-#
+#   Each alternative has a mixed-radix integer code over the attribute value
+#   counts, with the first attribute least significant. Codes run from 0 to
+#   size()-1 in the same numerical order used by each().
 
 from .alternative import Alternative
-from random import randint
+from random import randrange, getrandbits
+import numpy as np
+
+# Largest number of pairs for which pairs are sampled by pair index.
+PAIR_INDEX_LIMIT = 2**52
 
 class Domain:
     # Precond:
@@ -25,6 +31,14 @@ class Domain:
         self.attributes = attributes
         self.value = value[0:self.attributes]
         self.attributes = len(self.value)
+        self.radix = [1 for i in range(self.attributes)]
+        for i in range(1,self.attributes):
+            self.radix[i] = self.radix[i-1]*self.value[i-1]
+        self.count = 1
+        for item in self.value:
+            self.count *= item
+        # Boolean vectors over all codes, built on demand by literal_mask.
+        self.masks = {}
 
     # Precond:
     #   None.
@@ -57,16 +71,107 @@ class Domain:
                 result = item
         return result
 
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the number of alternatives in the domain.
+    def size(self):
+        return self.count
+
+    # Precond:
+    #   alt is a valid Alternative object for this domain.
+    #
+    # Postcond:
+    #   Returns the integer code of the alternative.
+    def encode(self, alt):
+        if alt.domain is self and alt.cached_code is not None:
+            return alt.cached_code
+        code = 0
+        for i in range(self.attributes):
+            code += (alt.values[i]-1)*self.radix[i]
+        return code
+
+    # Precond:
+    #   code is an integer between 0 and size()-1.
+    #
+    # Postcond:
+    #   Returns the Alternative object with the given code.
+    def decode(self, code):
+        values = [1 for i in range(self.attributes)]
+        rest = code
+        for i in range(self.attributes):
+            rest, values[i] = divmod(rest, self.value[i])
+            values[i] += 1
+        result = Alternative(values, self)
+        result.cached_code = code
+        result.trusted = self
+        return result
+
+    # Precond:
+    #   attr is an integer representing an attribute.
+    #   value is a value of the attribute.
+    #
+    # Postcond:
+    #   Returns a read-only (size(),) boolean array which is True at the code
+    #   of each alternative whose attribute attr has the given value.
+    #   The array is all False for an attribute outside the domain.
+    def literal_mask(self, attr, value):
+        key = (attr, value)
+        if key not in self.masks:
+            if attr < 0 or attr >= self.attributes:
+                mask = np.zeros(self.count, dtype=bool)
+            else:
+                codes = np.arange(self.count, dtype=np.int64)
+                mask = (codes//self.radix[attr])%self.value[attr] == value-1
+            mask.flags.writeable = False
+            self.masks[key] = mask
+        return self.masks[key]
+
+    # Precond:
+    #   alts is an (N, attributes) integer array of attribute values.
+    #
+    # Postcond:
+    #   Returns an (N,) boolean array which is True for each alternative that
+    #   fits the domain.
+    def contains_array(self, alts):
+        alts = np.asarray(alts)
+        if alts.ndim != 2 or alts.shape[1] != self.attributes:
+            return np.zeros(len(alts), dtype=bool)
+        return ((alts >= 1) & (alts <= np.array(self.value))).all(axis=1)
+
+    # Precond:
+    #   alts is an (N, attributes) integer array of attribute values.
+    #
+    # Postcond:
+    #   Returns an (N,) int64 array of the codes of the alternatives.
+    def encode_array(self, alts):
+        alts = np.asarray(alts, dtype=np.int64)
+        return (alts-1) @ np.array(self.radix, dtype=np.int64)
+
+    # Precond:
+    #   codes is an integer array of codes.
+    #
+    # Postcond:
+    #   Returns an (N, attributes) int32 array of attribute values.
+    def decode_array(self, codes):
+        codes = np.asarray(codes, dtype=np.int64).reshape(-1,1)
+        radix = np.array(self.radix, dtype=np.int64)
+        value = np.array(self.value, dtype=np.int64)
+        return ((codes//radix)%value + 1).astype(np.int32)
+
     # Precond:
     #   None.
     #
     # Postcond:
     #   Returns a random pair of alternatives, with a canonical ordering.
     def random_pair(self):
-        alt1 = Alternative([randint(1,self.value[i]) for i in range(self.attributes)])
-        alt2 = Alternative([randint(1,self.value[i]) for i in range(self.attributes)])
-        while alt1 == alt2:
-            alt2 = Alternative([randint(1,self.value[i]) for i in range(self.attributes)])
+        code1 = randrange(self.count)
+        code2 = randrange(self.count-1)
+        if code2 >= code1:
+            code2 += 1
+        alt1 = self.decode(code1)
+        alt2 = self.decode(code2)
         for i in range(self.attributes):
             if alt1.value(i) < alt2.value(i):
                 return (alt1,alt2)
@@ -74,23 +179,140 @@ class Domain:
                 return (alt2,alt1)
         return (alt1, alt2)
 
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the number of unordered pairs of distinct alternatives.
+    def pair_count(self):
+        return (self.count*(self.count-1))//2
+
+    # Precond:
+    #   code1 is an integer array of codes.
+    #   code2 is an integer array of codes, each different from code1.
+    #
+    # Postcond:
+    #   Returns the int64 array of pair indices of the unordered pairs.
+    #   The pair {i,j} with i < j has index j*(j-1)/2 + i.
+    def pair_rank(self, code1, code2):
+        code1 = np.asarray(code1, dtype=np.int64)
+        code2 = np.asarray(code2, dtype=np.int64)
+        low = np.minimum(code1,code2)
+        high = np.maximum(code1,code2)
+        return (high*(high-1))//2 + low
+
+    # Precond:
+    #   ranks is an integer array of pair indices less than pair_count().
+    #
+    # Postcond:
+    #   Returns the tuple (low, high) of int64 code arrays of the pairs with
+    #   the given indices (see pair_rank), with low < high.
+    def pair_unrank(self, ranks):
+        ranks = np.asarray(ranks, dtype=np.int64)
+        high = np.floor((1.0+np.sqrt(1.0+8.0*ranks))/2.0).astype(np.int64)
+        # Correct for floating point error in the square root.
+        high = np.where((high*(high-1))//2 > ranks, high-1, high)
+        high = np.where(((high+1)*high)//2 <= ranks, high+1, high)
+        return (ranks - (high*(high-1))//2, high)
+
+    # Precond:
+    #   start is the first pair index to include.
+    #   stop is one past the last pair index to include, or None for
+    #       pair_count().
+    #
+    # Postcond:
+    #   Returns the tuple (alt1, alt2) of int32 arrays holding the pairs with
+    #   indices start through stop-1, in pair index order. As in each_pair,
+    #   alt1 precedes alt2 in numerical order.
+    def pair_arrays(self, start=0, stop=None):
+        if stop is None:
+            stop = self.pair_count()
+        low, high = self.pair_unrank(np.arange(start,stop,dtype=np.int64))
+        return (self.decode_array(low), self.decode_array(high))
+
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Returns the pair of arrays reordered so that each pair is in the
+    #   canonical ordering used by random_pair.
+    @staticmethod
+    def canonical_pairs(alt1, alt2):
+        diff = (alt1 != alt2)
+        first = np.argmax(diff,axis=1)
+        rows = np.arange(len(alt1))
+        swap = (alt1[rows,first] > alt2[rows,first]).reshape(-1,1)
+        return (np.where(swap,alt2,alt1), np.where(swap,alt1,alt2))
+
+    # Precond:
+    #   size is an integer indicating the number of pairs to return.
+    #   rng is a numpy Generator or None (then one is seeded from the random
+    #       module).
+    #
+    # Postcond:
+    #   Returns the tuple (alt1, alt2) of (size, attributes) int32 arrays
+    #   holding random pairs, with a canonical ordering and no two pairs
+    #   repeating.
+    #   Pairs are drawn without replacement from the pair indices when the
+    #   domain is small enough to index, otherwise by hashed rejection
+    #   sampling.
+    def random_pair_array(self, size, rng=None):
+        if size > self.pair_count():
+            raise ValueError("Cannot draw " + str(size) + " distinct pairs from a domain with " + str(self.pair_count()) + " pairs.")
+        if rng is None:
+            rng = np.random.default_rng(getrandbits(64))
+        if self.pair_count() <= PAIR_INDEX_LIMIT:
+            ranks = rng.choice(self.pair_count(), size=size, replace=False)
+            low, high = self.pair_unrank(ranks)
+            alt1 = self.decode_array(low)
+            alt2 = self.decode_array(high)
+        else:
+            alt1, alt2 = self._rejection_pairs(size, rng)
+        return Domain.canonical_pairs(alt1, alt2)
+
+    # Precond:
+    #   size is an integer indicating the number of pairs to return.
+    #   rng is a numpy Generator.
+    #
+    # Postcond:
+    #   Returns size distinct pairs of distinct alternatives, found by drawing
+    #   batches of random pairs and discarding repeats via a hash set.
+    def _rejection_pairs(self, size, rng):
+        high = np.array(self.value) + 1
+        seen = set()
+        alt1 = np.zeros((size,self.attributes), dtype=np.int32)
+        alt2 = np.zeros((size,self.attributes), dtype=np.int32)
+        found = 0
+        while found < size:
+            batch = size - found
+            cand1 = rng.integers(1, high, size=(batch,self.attributes), dtype=np.int32)
+            cand2 = rng.integers(1, high, size=(batch,self.attributes), dtype=np.int32)
+            keep = (cand1 != cand2).any(axis=1)
+            cand1, cand2 = Domain.canonical_pairs(cand1[keep], cand2[keep])
+            for i in range(len(cand1)):
+                key = cand1[i].tobytes() + cand2[i].tobytes()
+                if key in seen:
+                    continue
+                seen.add(key)
+                alt1[found] = cand1[i]
+                alt2[found] = cand2[i]
+                found += 1
+        return (alt1, alt2)
+
     # Postcond:
     #   size is an integer indicating the number of pairs to return.
     #
     # Precond:
     #   Returns a random set of pairs, with no two pairs repeating.
     def random_pair_set(self, size):
-        result = [self.random_pair() for i in range(size)]
-        found = False
-        while len(result) != size:
-            temp = self.random_pair()
-            found = True
-            for pair in result:
-                if pair[0] == temp[0] and pair[1] == temp[1]:
-                    found = False
-                    break
-            if found:
-                result.append(temp)
+        alt1, alt2 = self.random_pair_array(size)
+        alt1 = alt1.tolist()
+        alt2 = alt2.tolist()
+        result = [(Alternative(alt1[i],self),Alternative(alt2[i],self)) for i in range(size)]
+        for pair in result:
+            pair[0].trusted = self
+            pair[1].trusted = self
         return result
 
 
@@ -102,15 +324,11 @@ class Domain:
     #   (least significant attribute first). If alt is specified then the
     #   iteration starts from that alternative.
     def each(self, alt=None):
-        if alt is None:
-            alt = Alternative([1 for i in range(self.attributes)])
-        else:
-            alt = Alternative([alt.value(i) for i in range(self.attributes)])
-        if not self.is_highest(alt):
-            while not self.is_highest(alt):
-                yield alt
-                alt = self.next_alternative(alt)
-        yield alt
+        start = 0
+        if alt is not None:
+            start = self.encode(alt)
+        for code in range(start,self.count):
+            yield self.decode(code)
 
     # Precond:
     #   None.
@@ -119,10 +337,10 @@ class Domain:
     #   Iterator that yeilds each possible unique pair of alternatives in
     #   numerical order (least significant attribute first).
     def each_pair(self):
-        for alt1 in self.each():
-            if not self.is_highest(alt1):
-                for alt2 in self.each(self.next_alternative(alt1)):
-                    yield (alt1,alt2)
+        alts = list(self.each())
+        for i in range(len(alts)):
+            for j in range(i+1,len(alts)):
+                yield (alts[i],alts[j])
 
 
     # Precond:
@@ -143,6 +361,8 @@ class Domain:
     #   Returns the next alternativein numerical order (least significant
     #   attribute first).
     def next_alternative(self, alt):
+        if not self.is_highest(alt):
+            return self.decode(self.encode(alt)+1)
         n_alt = Alternative([alt.value(i) for i in range(self.attributes)])
         n_alt.set(0,n_alt.value(0)+1)
         for i in range(self.attributes-1):
@@ -6,6 +6,8 @@
 # Notes:
 #   Updated on 25 Oct 2019
 #   Updated on 31 Oct 2019
+#   Updated on 18 Oct 2026: the size and a flattened (clumped by agent) list of
+#       examples are maintained so that len() and indexed access are O(1).
 
 from random import shuffle
 from torch.utils.data import Dataset
@@ -19,6 +21,8 @@ class ExampleSet(Dataset):
     #   Builds a new empty ExampleSet object
     def __init__(self):
         self.examples = {}
+        self.size = 0
+        self.flat = None
         # self.examples[0] = []
 
     # Precond:
@@ -28,16 +32,29 @@ class ExampleSet(Dataset):
     #   Files the example away based on the agent ID in the example.
     #   If there is no agent ID in the example the example is filed under
     #   the 'default' key.
+    #   The example's alternatives are validated against its domain once, here.
     def add_example(self, example):
+        self._validate(example)
         agent = example.get_agent()
         if agent is None:
-            if 0 not in self.examples:
-                self.examples[0] = []
-            self.examples[0].append(example)
-        else:
-            if agent not in self.examples:
-                self.examples[agent] = []
-            self.examples[agent].append(example)
+            agent = 0
+        if agent not in self.examples:
+            self.examples[agent] = []
+        self.examples[agent].append(example)
+        self.size += 1
+        self.flat = None
+
+    # Precond:
+    #   example is a valid Example object.
+    #
+    # Postcond:
+    #   Validates the example's alternatives against the example's domain so
+    #   that models sharing the domain need not revalidate them.
+    def _validate(self, example):
+        domain = example.get_domain()
+        if domain is not None:
+            for alt in example.get_alts():
+                alt.matches(domain)
 
     # Precond:
     #   None.
@@ -64,13 +81,15 @@ class ExampleSet(Dataset):
     #   the 'default' key.
     def add_example_list(self, examples):
         for example in examples:
+            self._validate(example)
             agent = example.get_agent()
             if agent is None:
-                self.examples[-1].append(example)
-            else:
-                if agent not in self.examples:
-                    self.examples[agent] = []
-                self.examples[agent].append(example)
+                agent = 0
+            if agent not in self.examples:
+                self.examples[agent] = []
+            self.examples[agent].append(example)
+            self.size += 1
+        self.flat = None
 
     # Precond:
     #   None.
@@ -78,10 +97,20 @@ class ExampleSet(Dataset):
     # Postcond:
     #   Returns a single list with all examples.
     def example_list(self):
-        result = []
-        for id,lst in self.examples.items():
-            result.extend(lst)
-        return result
+        return list(self._index())
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the flattened list of all examples (clumped by agent), building
+    #   it if the example set has changed since it was last built.
+    def _index(self):
+        if self.flat is None:
+            self.flat = []
+            for id,lst in self.examples.items():
+                self.flat.extend(lst)
+        return self.flat
 
     # Precond:
     #   None.
@@ -91,6 +120,7 @@ class ExampleSet(Dataset):
     def shuffle(self):
         for id in self.examples:
             shuffle(self.examples[id])
+        self.flat = None
 
     # Precond:
     #   example is a valid Example object.
@@ -157,10 +187,7 @@ class ExampleSet(Dataset):
     # Postcond:
     #   Returns the total number of examples in the set.
     def __len__(self):
-        total = 0
-        for id in self.examples:
-            total += len(self.examples[id])
-        return total
+        return self.size
 
     # Precond:
     #   i is the index of the example ot retrieve.
@@ -168,12 +195,9 @@ class ExampleSet(Dataset):
     # Postcond:
     #   Returns the ith example
     def __getitem__(self,i):
-        for id in self.examples:
-            if i >= len(self.examples[id]):
-                i -= len(self.examples[id])
-            else:
-                return self.prepare_example(self.examples[id][i])
-        return None
+        if i >= self.size:
+            return None
+        return self.prepare_example(self._index()[i])
 
     # Precond:
     #   i is the index of the example ot retrieve.
@@ -181,12 +205,9 @@ class ExampleSet(Dataset):
     # Postcond:
     #   Returns the ith example
     def get(self,i):
-        for id in self.examples:
-            if i >= len(self.examples[id]):
-                i -= len(self.examples[id])
-            else:
-                return self.examples[id][i]
-        return None
+        if i >= self.size:
+            return None
+        return self._index()[i]
 
     # Precond:
     #   n is an integer representing the number of folds.
@@ -12,20 +12,56 @@
 #        2: alt1 is strictly preferred to alt2
 #        3: alt1 is incomparable with alt2
 #   3 and -3 represent the same status
+#   Relations are interned: there is exactly one Relation object per value,
+#   so relations are compared by identity and can be used as dict keys. The
+#   value doubles as the int8 code used when storing relations in arrays.
 
 class Relation:
+    __slots__ = ('value',)
+    interned = {}
+
     # Precond:
     #   values is the comparison value of two objects.
     #
     # Postcond:
-    #   Builds a new Relation object.
+    #   Returns the Relation object for the value.
     #   If value is outside the bounds of the defined values above,
     #   default to 3.
-    def __init__(self, value):
+    def __new__(cls, value):
+        value = int(value)
         if abs(value) >= 3:
-            self.value = 3
-        else:
-            self.value = value
+            value = 3
+        result = Relation.interned.get(value)
+        if result is None:
+            result = object.__new__(cls)
+            result.value = value
+            Relation.interned[value] = result
+        return result
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Keeps relations interned when they are pickled or copied.
+    def __reduce__(self):
+        return (Relation, (self.value,))
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the int8 code of the relation, for array storage.
+    def code(self):
+        return self.value
+
+    # Precond:
+    #   code is an integer relation code.
+    #
+    # Postcond:
+    #   Returns the Relation object for the code.
+    @staticmethod
+    def from_code(code):
+        return Relation(code)
 
     # Precond:
     #   None.
@@ -111,7 +147,15 @@ class Relation:
     # Postcond:
     #   Returns true if the relations are the same.
     def __eq__(self, other):
-        return self.value == other.value
+        return self is other
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns a hash consistent with __eq__.
+    def __hash__(self):
+        return hash(self.value)
 
 
     # Static methods for the various relations.
@@ -123,7 +167,7 @@ class Relation:
     #   Returns a Relation object representing strict dispreference.
     @staticmethod
     def strict_dispreference():
-        return Relation(-2)
+        return Relation.STRICT_DISPREFERENCE
 
     # Precond:
     #   None.
@@ -132,7 +176,7 @@ class Relation:
     #   Returns a Relation object representing dispreference.
     @staticmethod
     def dispreference():
-        return Relation(-1)
+        return Relation.DISPREFERENCE
 
     # Precond:
     #   None.
@@ -141,7 +185,7 @@ class Relation:
     #   Returns a Relation object representing equal preference.
     @staticmethod
     def equal():
-        return Relation(0)
+        return Relation.EQUAL
 
     # Precond:
     #   None.
@@ -150,7 +194,7 @@ class Relation:
     #   Returns a Relation object representing preference.
     @staticmethod
     def preference():
-        return Relation(1)
+        return Relation.PREFERENCE
 
     # Precond:
     #   None.
@@ -159,7 +203,7 @@ class Relation:
     #   Returns a Relation object representing strict preference.
     @staticmethod
     def strict_preference():
-        return Relation(2)
+        return Relation.STRICT_PREFERENCE
 
     # Precond:
     #   None.
@@ -168,4 +212,12 @@ class Relation:
     #   Returns a Relation object representing incomparablility.
     @staticmethod
     def incomparable():
-        return Relation(3)
+        return Relation.INCOMPARABLE
+
+# The six interned relations.
+Relation.STRICT_DISPREFERENCE = Relation(-2)
+Relation.DISPREFERENCE = Relation(-1)
+Relation.EQUAL = Relation(0)
+Relation.PREFERENCE = Relation(1)
+Relation.STRICT_PREFERENCE = Relation(2)
+Relation.INCOMPARABLE = Relation(3)
@@ -8,9 +8,17 @@ import sys, os
 sys.path.insert(0, os.path.abspath('..'))
 
 import random
+import numpy as np
 from examples.relation import Relation
+from utility.batch_eval import example_arrays
 from itertools import permutations
 
+# Largest number of attribute values for which learn_greedy finds an optimal
+# value order exactly (the search takes 2**values steps), and the same for
+# learn_greedy_maximin (which scores all values! orders).
+EXACT_ORDER_LIMIT = 16
+EXACT_MAXIMIN_LIMIT = 7
+
 class LPM:
     # Precond:
     #   domain is a valid Domain object.
@@ -21,6 +29,7 @@ class LPM:
         self.domain = domain
         self.importance = []
         self.orders = []
+        self.move = None
 
 
     # Precond:
@@ -84,6 +93,7 @@ class LPM:
     #
     # Postcond:
     #   Returns a random LPM object which is a neighbor of this LPM object.
+    #   The neighbor's move attribute records the change (see neighbors).
     def random_neighbor(self):
         result = LPM(self.domain)
         result.orders.extend(self.orders)
@@ -93,12 +103,15 @@ class LPM:
             sw = result.importance[swap_index]
             result.importance[swap_index] = result.importance[swap_index+1]
             result.importance[swap_index+1] = sw
+            result.move = ('importance', swap_index)
         else:
             order_swap = random.randint(0,len(result.orders)-1)
             swap_index = random.randint(0,len(result.orders[order_swap])-2)
+            result.orders[order_swap] = list(result.orders[order_swap])
             sw = result.orders[order_swap][swap_index]
             result.orders[order_swap][swap_index] = result.orders[order_swap][swap_index+1]
             result.orders[order_swap][swap_index+1] = sw
+            result.move = ('order', order_swap, swap_index)
         return result
 
     # Precond:
@@ -106,6 +119,12 @@ class LPM:
     #
     # Postcond:
     #   Iterates through all neighbors of this LPM object.
+    #   Each neighbor's move attribute records the change:
+    #       ('importance', i): importance positions i and i+1 were swapped.
+    #       ('order', attr, i): positions i and i+1 of the attribute's value
+    #           order were swapped.
+    #   Neighbors share unchanged value orders with this LPM, so orders are
+    #   never modified in place.
     def neighbors(self):
         for i in range(len(self.importance)-1):
             temp = LPM(self.domain)
@@ -114,15 +133,18 @@ class LPM:
             sw = temp.importance[i]
             temp.importance[i] = temp.importance[i+1]
             temp.importance[i+1] = sw
+            temp.move = ('importance', i)
             yield temp
         for i in range(len(self.orders)):
             for j in range(len(self.orders[i])-1):
                 temp = LPM(self.domain)
                 temp.orders.extend(self.orders)
                 temp.importance.extend(self.importance)
+                temp.orders[i] = list(temp.orders[i])
                 sw = temp.orders[i][j]
                 temp.orders[i][j] = temp.orders[i][j+1]
                 temp.orders[i][j+1] = sw
+                temp.move = ('order', i, j)
                 yield temp
 
     # Precond:
@@ -145,6 +167,43 @@ class LPM:
                     return Relation.strict_dispreference()
         return Relation.equal()
 
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns an (attributes, largest value+1) integer array where entry
+    #   [attr, value] is the position of value in the attribute's order.
+    def rank_table(self):
+        result = np.zeros((self.domain.length(), self.domain.attr_length_largest()+1), dtype=np.int32)
+        for attr in range(len(self.orders)):
+            for rank, value in enumerate(self.orders[attr]):
+                result[attr,value] = rank
+        return result
+
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives in the domain.
+    #   alt2 is an (N, attributes) integer array of alternatives in the domain.
+    #
+    # Postcond:
+    #   Returns an (N,) int8 array of the relation values of each pair, as
+    #   compare would return them.
+    def compare_batch(self, alt1, alt2):
+        alt1 = np.asarray(alt1)
+        alt2 = np.asarray(alt2)
+        result = np.full(len(alt1), Relation.equal().value, dtype=np.int8)
+        if len(alt1) == 0 or len(self.importance) == 0:
+            return result
+        importance = np.array(self.importance)
+        differ = alt1[:,importance] != alt2[:,importance]
+        first = np.argmax(differ, axis=1)
+        rows = np.flatnonzero(differ[np.arange(len(alt1)),first])
+        attrs = importance[first[rows]]
+        ranks = self.rank_table()
+        better = ranks[attrs,alt1[rows,attrs]] < ranks[attrs,alt2[rows,attrs]]
+        result[rows] = np.where(better, Relation.strict_preference().value,
+                                Relation.strict_dispreference().value)
+        return result
+
 
     # Precond:
     #   lines is a set of strings which specifies an LPM.
@@ -191,106 +250,301 @@ class LPM:
         return result
 
     # Precond:
-    #   ex_set is a valid ExampleSet object.
+    #   None.
+    #
+    # Postcond:
+    #   Returns a unique string for use in a neighborhood evaluation graph or
+    #   an evaluation cache. Only the orders of important attributes are
+    #   included, so LPMs which compare alike share a string.
+    def node_str(self):
+        ns_func = lambda x: str(x) + ':' + ','.join(list(map(str,self.orders[x])))
+        return ';'.join(list(map(ns_func,self.importance)))
+
+    # Precond:
+    #   ex_set is a valid ExampleSet or ArrayExampleSet object.
     #   domain is a valid Domain object.
     #
     # Postcond:
     #   Returns an LPM learned from the ExampleSet
+    #   Attributes are picked greedily, each with the value order that
+    #   disagrees with the fewest strict examples not decided by an earlier
+    #   attribute. Ties go to the earlier attribute and then to the
+    #   lexicographically smallest order. The example set is not modified.
     @staticmethod
     def learn_greedy(ex_set, domain):
-        ex_set.unflag_all()
-        for ex in ex_set.each_unflagged():
-            if ex.get_relation() == Relation.equal():
-                ex.flag()
+        alt1, alt2, relation, _ = example_arrays(ex_set)
+        active = (relation == Relation.strict_preference().value) | (relation == Relation.strict_dispreference().value)
         importance = []
         orders = [[j+1 for j in range(domain.attr_length(i))] for i in range(domain.length())]
         possible_next = [i for i in range(domain.length())]
         while len(possible_next) != 0:
             best_attr = possible_next[0]
             best_score = -1
-            best_order = [i+1 for i in range(domain.attr_length(best_attr))]
+            best_order = orders[best_attr]
             for attr in possible_next:
-                values = [i+1 for i in range(domain.attr_length(attr))]
-                for order in permutations(values,len(values)):
-                    incorrect = 0
-                    for ex in ex_set.each_unflagged():
-                        if ex.get_alts()[0].value(attr) == ex.get_alts()[1].value(attr):
-                            continue
-                        rank1 = order.index(ex.get_alts()[0].value(attr))
-                        rank2 = order.index(ex.get_alts()[1].value(attr))
-                        if ex.get_relation() == Relation.strict_preference():
-                            if rank1 > rank2:
-                                incorrect += 1
-                        if ex.get_relation() == Relation.strict_dispreference():
-                            if rank1 < rank2:
-                                incorrect += 1
-                    if best_score == -1 or incorrect < best_score:
-                        best_score = incorrect
-                        best_attr = attr
-                        best_order = order[:]
+                counts = LPM.order_counts(alt1, alt2, relation, active, attr, domain.attr_length(attr))
+                order, incorrect = LPM.best_order(counts[0])
+                if best_score == -1 or incorrect < best_score:
+                    best_score = incorrect
+                    best_attr = attr
+                    best_order = order
             importance.append(best_attr)
             orders[best_attr] = best_order
             possible_next.remove(best_attr)
-            for ex in ex_set.each_unflagged():
-                if ex.get_alts()[0].value(best_attr) != ex.get_alts()[1].value(best_attr):
-                    ex.flag()
+            active &= alt1[:,best_attr] == alt2[:,best_attr]
         result = LPM(domain)
         result.importance = importance
         result.orders = orders
         return result
 
     # Precond:
-    #   ex_set is a valid ExampleSet object.
+    #   ex_set is a valid ExampleSet or ArrayExampleSet object.
     #   domain is a valid Domain object.
     #
     # Postcond:
     #   Returns an LPM learned from the ExampleSet in a Maximin manner
+    #   As learn_greedy, but orders are scored by the largest number of
+    #   disagreeing examples from any single agent.
     @staticmethod
     def learn_greedy_maximin(ex_set, domain):
-        ex_set.unflag_all()
-        for ex in ex_set.each_unflagged():
-            if ex.get_relation() == Relation.equal():
-                ex.flag()
+        alt1, alt2, relation, agent = example_arrays(ex_set)
+        active = (relation == Relation.strict_preference().value) | (relation == Relation.strict_dispreference().value)
+        agents = list(ex_set.get_agents())
+        group = np.full(len(agent), -1, dtype=np.int64)
+        for i in range(len(agents)):
+            key = agents[i]
+            if key is None:
+                key = 0
+            group[agent == key] = i
         importance = []
         orders = [[j+1 for j in range(domain.attr_length(i))] for i in range(domain.length())]
         possible_next = [i for i in range(domain.length())]
-        agents = ex_set.get_agents()
         while len(possible_next) != 0:
             best_attr = possible_next[0]
             best_score = -1
-            best_order = [i+1 for i in range(domain.attr_length(best_attr))]
+            best_order = orders[best_attr]
             for attr in possible_next:
-                values = [i+1 for i in range(domain.attr_length(attr))]
-                for order in permutations(values,len(values)):
-                    agent_counts = {}
-                    for agent in agents:
-                        agent_counts[agent] = 0
-                    for ex in ex_set.each_unflagged():
-                        if ex.get_alts()[0].value(attr) == ex.get_alts()[1].value(attr):
-                            continue
-                        rank1 = order.index(ex.get_alts()[0].value(attr))
-                        rank2 = order.index(ex.get_alts()[1].value(attr))
-                        if ex.get_relation() == Relation.strict_preference():
-                            if rank1 > rank2:
-                                agent_counts[ex.get_agent()] += 1
-                        if ex.get_relation() == Relation.strict_dispreference():
-                            if rank1 < rank2:
-                                agent_counts[ex.get_agent()] += 1
-                    incorrect = 0
-                    for _, count in agent_counts.items():
-                        if count > incorrect:
-                            incorrect = count
-                    if best_score == -1 or incorrect < best_score:
-                        best_score = incorrect
-                        best_attr = attr
-                        best_order = order[:]
+                counts = LPM.order_counts(alt1, alt2, relation, active, attr, domain.attr_length(attr), group, len(agents))
+                order, incorrect = LPM.best_order_maximin(counts)
+                if best_score == -1 or incorrect < best_score:
+                    best_score = incorrect
+                    best_attr = attr
+                    best_order = order
             importance.append(best_attr)
             orders[best_attr] = best_order
             possible_next.remove(best_attr)
-            for ex in ex_set.each_unflagged():
-                if ex.get_alts()[0].value(best_attr) != ex.get_alts()[1].value(best_attr):
-                    ex.flag()
+            active &= alt1[:,best_attr] == alt2[:,best_attr]
+        result = LPM(domain)
+        result.importance = importance
+        result.orders = orders
+        return result
+
+    # Precond:
+    #   ex_set is a valid ExampleSet or ArrayExampleSet object.
+    #   domain is a valid Domain object.
+    #
+    # Postcond:
+    #   Returns an LPM which disagrees with the fewest strict examples in the
+    #   ExampleSet (given that each attribute's value order is chosen as in
+    #   learn_greedy).
+    #   Searches importance orders depth first over the set of attributes
+    #   placed so far. The examples a set leaves undecided are held as an
+    #   integer bitset, the error of placing each attribute after each set is
+    #   memoized, and branches which cannot beat the best LPM found (starting
+    #   from the greedy LPM) are cut. Time grows as 2**attributes in the
+    #   worst case, so this is meant for up to about 16 attributes.
+    @staticmethod
+    def learn_exact(ex_set, domain):
+        alt1, alt2, relation, _ = example_arrays(ex_set)
+        active = (relation == Relation.strict_preference().value) | (relation == Relation.strict_dispreference().value)
+        length = domain.length()
+        full = (1 << length) - 1
+        to_bits = lambda mask: int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+        nbytes = (len(relation)+7)//8
+        to_mask = lambda bits: np.unpackbits(np.frombuffer(bits.to_bytes(nbytes, 'little'), dtype=np.uint8), count=len(relation), bitorder='little').astype(bool)
+        equal = [to_bits(alt1[:,a] == alt2[:,a]) for a in range(length)]
+        # errors[S] holds, for the attribute set S, the (error, order) of each
+        # attribute which may be placed next.
+        errors = {}
+        def place(placed, undecided):
+            if placed not in errors:
+                mask = to_mask(undecided)
+                errors[placed] = {}
+                for a in range(length):
+                    if not (placed >> a) & 1:
+                        counts = LPM.order_counts(alt1, alt2, relation, mask, a, domain.attr_length(a))
+                        order, incorrect = LPM.best_order(counts[0])
+                        errors[placed][a] = (incorrect, order)
+            return errors[placed]
+        exact = {}
+        lower = {}
+        choice = {}
+        # Returns the least error of the attributes outside placed if it is
+        # below budget, otherwise a lower bound on it which is >= budget.
+        def solve(placed, undecided, budget):
+            if undecided == 0 or placed == full:
+                return 0
+            if placed in exact:
+                return exact[placed]
+            if lower.get(placed, 0) >= budget:
+                return lower[placed]
+            options = place(placed, undecided)
+            best = None
+            for a in sorted(options, key=lambda x: options[x][0]):
+                cutoff = budget if best is None else min(best, budget)
+                if options[a][0] >= cutoff:
+                    break
+                total = options[a][0] + solve(placed | (1 << a), undecided & equal[a], cutoff - options[a][0])
+                if total < cutoff:
+                    best = total
+                    choice[placed] = a
+            if best is None:
+                lower[placed] = budget
+                return budget
+            exact[placed] = best
+            return best
+        greedy = LPM.learn_greedy(ex_set, domain)
+        budget = 1 + int(np.count_nonzero(active & (greedy.compare_batch(alt1, alt2) != relation)))
+        solve(0, to_bits(active), budget)
+        importance = []
+        orders = [[j+1 for j in range(domain.attr_length(i))] for i in range(length)]
+        placed = 0
+        undecided = to_bits(active)
+        while placed in choice:
+            a = choice[placed]
+            importance.append(a)
+            orders[a] = errors[placed][a][1]
+            placed |= 1 << a
+            undecided &= equal[a]
+        importance.extend([a for a in range(length) if not (placed >> a) & 1])
         result = LPM(domain)
         result.importance = importance
         result.orders = orders
         return result
+
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #   relation is an (N,) array of relation values.
+    #   active is an (N,) boolean array of the examples to count.
+    #   attr is the attribute to count.
+    #   size is the number of values of the attribute.
+    #   group is an (N,) integer array of group indices (-1 to skip the
+    #       example), or None to count all examples in one group.
+    #   groups is the number of groups.
+    #
+    # Postcond:
+    #   Returns a (groups, size, size) integer array where entry [g, u, v] is
+    #   the number of active strict examples in group g whose preferred
+    #   alternative has value u+1 and whose other alternative has value v+1
+    #   on the attribute.
+    @staticmethod
+    def order_counts(alt1, alt2, relation, active, attr, size, group=None, groups=1):
+        rows = active & (alt1[:,attr] != alt2[:,attr])
+        if group is not None:
+            rows &= group >= 0
+        rows = np.flatnonzero(rows)
+        forward = relation[rows] == Relation.strict_preference().value
+        better = np.where(forward, alt1[rows,attr], alt2[rows,attr]).astype(np.int64) - 1
+        worse = np.where(forward, alt2[rows,attr], alt1[rows,attr]).astype(np.int64) - 1
+        cell = better*size + worse
+        if group is not None:
+            cell += group[rows]*size*size
+        counts = np.bincount(cell, minlength=groups*size*size)
+        return counts.reshape(groups, size, size)
+
+    # Precond:
+    #   counts is a (size, size) integer array as built by order_counts.
+    #
+    # Postcond:
+    #   Returns a pair (order, incorrect) of a value order (a list of the
+    #   values 1..size, most preferred first) and the number of counted
+    #   examples the order disagrees with.
+    #   For up to EXACT_ORDER_LIMIT values the order is the lexicographically
+    #   smallest optimal order, found by dynamic programming over the sets of
+    #   values placed first. Otherwise it is found by local search.
+    @staticmethod
+    def best_order(counts):
+        size = len(counts)
+        if size > EXACT_ORDER_LIMIT:
+            return LPM.search_order(counts[None])
+        counts = counts.astype(np.int64)
+        # cost[S, u] is the number of examples preferring u over a value in S.
+        cost = np.zeros((1 << size, size), dtype=np.int64)
+        for b in range(size):
+            cost[1<<b:1<<(b+1)] = cost[:1<<b] + counts[:,b]
+        sets = np.arange(1 << size)
+        members = (sets[:,None] >> np.arange(size)) & 1
+        popcount = members.sum(axis=1)
+        # rest[S] is the least cost of ordering the values outside S after S.
+        rest = np.zeros(1 << size, dtype=np.int64)
+        for placed in range(size-1,-1,-1):
+            layer = sets[popcount == placed]
+            options = cost[layer] + rest[layer[:,None] | (1 << np.arange(size))]
+            options[members[layer] == 1] = np.iinfo(np.int64).max
+            rest[layer] = options.min(axis=1)
+        order = []
+        placed = 0
+        for _ in range(size):
+            for u in range(size):
+                if not (placed >> u) & 1 and cost[placed,u] + rest[placed | (1 << u)] == rest[placed]:
+                    break
+            order.append(u+1)
+            placed |= 1 << u
+        return (order, int(rest[0]))
+
+    # Precond:
+    #   counts is a (groups, size, size) integer array as built by
+    #   order_counts.
+    #
+    # Postcond:
+    #   Returns a pair (order, incorrect) of a value order (a list of the
+    #   values 1..size, most preferred first) and the largest number of
+    #   counted examples of any one group the order disagrees with.
+    #   For up to EXACT_MAXIMIN_LIMIT values every order is scored and the
+    #   lexicographically smallest optimal order is returned. Otherwise the
+    #   order is found by local search.
+    @staticmethod
+    def best_order_maximin(counts):
+        size = counts.shape[1]
+        if size > EXACT_MAXIMIN_LIMIT:
+            return LPM.search_order(counts)
+        perms = np.array(list(permutations(range(size))), dtype=np.int64).reshape(-1, size)
+        position = np.argsort(perms, axis=1)
+        later = position[:,:,None] > position[:,None,:]
+        incorrect = np.einsum('puv,guv->pg', later.astype(np.int64), counts.astype(np.int64)).max(axis=1, initial=0)
+        best = int(np.argmin(incorrect))
+        return ([int(v)+1 for v in perms[best]], int(incorrect[best]))
+
+    # Precond:
+    #   counts is a (groups, size, size) integer array as built by
+    #   order_counts.
+    #
+    # Postcond:
+    #   Returns a pair (order, incorrect) as best_order_maximin does, found
+    #   by starting from the values ranked by net wins and moving single
+    #   values to new positions while that lowers the score.
+    @staticmethod
+    def search_order(counts):
+        counts = counts.astype(np.int64)
+        size = counts.shape[1]
+        total = counts.sum(axis=0)
+        wins = total.sum(axis=1) - total.sum(axis=0)
+        order = [int(v) for v in np.argsort(-wins, kind='stable')]
+        score = lambda o: int(np.tril(counts[:,o][:,:,o], -1).sum(axis=(1,2)).max(initial=0))
+        best = score(order)
+        improved = True
+        while improved:
+            improved = False
+            for i in range(size):
+                for j in range(size):
+                    if i == j:
+                        continue
+                    candidate = order[:i] + order[i+1:]
+                    candidate.insert(j, order[i])
+                    value = score(candidate)
+                    if value < best:
+                        best = value
+                        order = candidate
+                        improved = True
+        return ([v+1 for v in order], best)
@@ -4,6 +4,7 @@
 # Purpose:
 #   A neural net for learning preferences directly from examples.
 
+import numpy as np
 import torch
 import torch.nn as nn
 # import torch.nn.function as F
@@ -36,6 +37,22 @@ class NeuralPreference(nn.Module):
         x = self.squash(x)
         return x
 
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Returns an (N,) int8 array of the relation values the network assigns
+    #   to each pair (the most likely label, as in Relation.parse_label).
+    def compare_batch(self, alt1, alt2):
+        inp = np.concatenate([alt1,alt2],axis=1).astype(np.float32)
+        inp = torch.from_numpy(inp).to(next(self.parameters()).device)
+        with torch.no_grad():
+            label = torch.argmax(self.forward(inp),dim=1)
+        label = label.cpu().numpy() - 2
+        label[label > 3] = 3
+        return label.astype(np.int8)
+
 
 # Precond:
 #   example is a valid Example object.
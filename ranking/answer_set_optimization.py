@@ -9,7 +9,8 @@
 import sys, os
 sys.path.insert(0, os.path.abspath('..'))
 
-from utility.pref_logic import PrefFormula
+import numpy as np
+from utility.pref_logic import PrefFormula, PrefLiteral
 from examples.relation import Relation
 from random import randint
 
@@ -59,6 +60,61 @@ class ASO:
                         break
         return result
 
+    # Precond:
+    #   alts is an (N, attributes) integer array of alternatives.
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns an (N, ranks, rules) int8 array of the satisfaction vectors of
+    #   the alternatives, as eval_DNF or eval_CNF would return them.
+    #   Ranks with fewer rules than the largest are padded with 0.
+    def satisfaction_batch(self, alts, dnf=True):
+        alts = np.asarray(alts)
+        rules = max([len(rank) for rank in self.ranks] + [0])
+        result = np.zeros((len(alts), len(self.ranks), rules), dtype=np.int8)
+        inside = np.flatnonzero(self.domain.contains_array(alts))
+        if len(inside) < len(alts):
+            alts = alts[inside]
+        for i in range(len(self.ranks)):
+            for j in range(len(self.ranks[i])):
+                rule = self.ranks[i][j]
+                result[:,i,j] = len(rule)+1
+                degree = np.full(len(inside), len(rule)+1, dtype=np.int8)
+                # Later formulas are overwritten by earlier ones, leaving the
+                # first one satisfied.
+                for k in range(len(rule)-1,-1,-1):
+                    degree[rule[k].satisfied(alts, not dnf)] = k+1
+                result[inside,i,j] = degree
+        return result
+
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns an (N,) int8 array of the relation values of each pair, as
+    #   compare would return them: each rank compares the pair's satisfaction
+    #   vectors by Pareto dominance and the first rank which does not find
+    #   them equal decides.
+    def compare_batch(self, alt1, alt2, dnf=True):
+        n = len(alt1)
+        sat = self.satisfaction_batch(np.concatenate([np.asarray(alt1), np.asarray(alt2)]), dnf)
+        better = (sat[:n] < sat[n:]).any(axis=2)
+        worse = (sat[:n] > sat[n:]).any(axis=2)
+        codes = np.full(better.shape, Relation.equal().value, dtype=np.int8)
+        codes[better] = Relation.strict_preference().value
+        codes[worse] = Relation.strict_dispreference().value
+        codes[better & worse] = Relation.incomparable().value
+        result = np.full(n, Relation.equal().value, dtype=np.int8)
+        if len(self.ranks) == 0:
+            return result
+        decided = codes != Relation.equal().value
+        first = np.argmax(decided, axis=1)
+        rows = np.flatnonzero(decided.any(axis=1))
+        result[rows] = codes[rows, first[rows]]
+        return result
+
     # Precond:
     #   alt1 is a valid Alternative object.
     #   alt2 is a valud Alternative object.
@@ -155,15 +211,99 @@ class ASO:
     #   None.
     #
     # Postcond:
-    #   Iterates through all neighbors of this ASO object.
+    #   Iterates through all neighbors of this ASO object: every change of a
+    #   single literal of a single formula.
     def neighbors(self):
         for i in range(len(self.ranks)):
             for j in range(len(self.ranks[i])):
                 for k in range(len(self.ranks[i][j])):
-                    result = self._copy()
                     for neighbor in self.ranks[i][j][k].neighbors():
+                        result = self._copy()
                         result.ranks[i][j][k] = neighbor
-                    yield result
+                        yield result
+
+    # Precond:
+    #   data is a NeighborhoodData object (see annealing/neighborhood.py)
+    #       over this ASO's domain.
+    #
+    # Postcond:
+    #   Iterates through pairs (moves, scores), one per literal of each
+    #   formula, covering all neighbors in the order neighbors() yields them.
+    #   Each move is ('literal', i, j, k, l, lit), replacing literal l of
+    #   formula k of rule j of rank i by lit, and scores holds the score of
+    #   each move on the data's examples (with DNF evaluation, as compare).
+    #   No neighbor is built: each literal's replacements only change the
+    #   degree of one rule, which is computed for all of them at once and
+    #   combined with the satisfaction tensor of the current ASO.
+    def neighbor_blocks(self, data):
+        literals = list(PrefLiteral.each_literal(self.domain))
+        count = len(data.alts)
+        truth = np.stack([lit.match_array(data.alts) for lit in literals], axis=1)
+        sat = self.satisfaction_batch(data.alts)
+        for i in range(len(self.ranks)):
+            for j in range(len(self.ranks[i])):
+                sat[~data.valid,i,j] = len(self.ranks[i][j])+1
+        sat1 = sat[data.first]
+        sat2 = sat[data.second]
+        less = sat1 < sat2
+        more = sat1 > sat2
+        equal = Relation.equal().value
+        codes = np.full((data.size, len(self.ranks)), equal, dtype=np.int8)
+        codes[less.any(axis=2)] = Relation.strict_preference().value
+        codes[more.any(axis=2)] = Relation.strict_dispreference().value
+        codes[less.any(axis=2) & more.any(axis=2)] = Relation.incomparable().value
+        for i in range(len(self.ranks)):
+            # The relation decided by the ranks before and after rank i.
+            before = np.full(data.size, equal, dtype=np.int8)
+            for r in range(i-1,-1,-1):
+                before[codes[:,r] != equal] = codes[codes[:,r] != equal, r]
+            after = np.full(data.size, equal, dtype=np.int8)
+            for r in range(len(self.ranks)-1,i,-1):
+                after[codes[:,r] != equal] = codes[codes[:,r] != equal, r]
+            for j in range(len(self.ranks[i])):
+                rule = self.ranks[i][j]
+                others = [r for r in range(len(self.ranks[i])) if r != j]
+                better = less[:,i,others].any(axis=1)
+                worse = more[:,i,others].any(axis=1)
+                for k in range(len(rule)):
+                    # The first formula before k each alternative satisfies
+                    # and the first one after it (len(rule)+1 if none).
+                    first = np.full(count, len(rule)+1, dtype=np.int8)
+                    for f in range(k-1,-1,-1):
+                        first[rule[f].satisfied(data.alts, False)] = f+1
+                    later = np.full(count, len(rule)+1, dtype=np.int8)
+                    for f in range(len(rule)-1,k,-1):
+                        later[rule[f].satisfied(data.alts, False)] = f+1
+                    formula = rule[k]
+                    for l in range(len(formula.literals)):
+                        keep, rest = formula.substitution(lambda x: x.match_array(data.alts), count, l, False)
+                        satisfied = keep[:,None] | (rest[:,None] & truth)
+                        degree = np.where(satisfied, k+1, later[:,None]).astype(np.int8)
+                        degree[first <= len(rule)] = first[first <= len(rule),None]
+                        degree[~data.valid] = len(rule)+1
+                        choices = [c for c in range(len(literals)) if not literals[c] == formula.literals[l]]
+                        degree = degree[:,choices]
+                        degree1 = degree[data.first]
+                        degree2 = degree[data.second]
+                        rank_better = better[:,None] | (degree1 < degree2)
+                        rank_worse = worse[:,None] | (degree1 > degree2)
+                        result = np.where(rank_better, Relation.strict_preference().value, after[:,None]).astype(np.int8)
+                        result[rank_worse] = Relation.strict_dispreference().value
+                        result[rank_better & rank_worse] = Relation.incomparable().value
+                        result[before != equal] = before[before != equal,None]
+                        scores = data.score_codes(result)
+                        yield ([('literal', i, j, k, l, literals[c]) for c in choices], scores)
+
+    # Precond:
+    #   move is a move from neighbor_blocks.
+    #
+    # Postcond:
+    #   Returns the neighbor the move leads to, as neighbors() builds it.
+    def apply_move(self, move):
+        i, j, k = move[1], move[2], move[3]
+        result = self._copy()
+        result.ranks[i][j][k] = self.ranks[i][j][k].replace(move[4], move[5])
+        return result
 
     # Precond:
     #   None.
@@ -227,6 +367,18 @@ class ASO:
                     result += ' '.join(['P', str(pref), "\n"])
         return result
 
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns a unique string for use in a neighborhood evaluation graph or
+    #   an evaluation cache. Ranks are separated by '|', rules by '/' and
+    #   formulas by ';'.
+    def node_str(self):
+        rule_str = lambda rule: ';'.join([form.node_str() for form in rule])
+        rank_str = lambda rank: '/'.join(list(map(rule_str,rank)))
+        return '|'.join(list(map(rank_str,self.ranks)))
+
     # Precond:
     #   domain is a valid Domain object.
     #   info is a valid dictionary (data unused, but important for typing).
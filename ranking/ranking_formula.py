@@ -6,7 +6,8 @@
 import sys, os
 sys.path.insert(0, os.path.abspath('..'))
 
-from utility.pref_logic import PrefFormula
+import numpy as np
+from utility.pref_logic import PrefFormula, PrefLiteral
 from examples.relation import Relation
 from random import randint
 
@@ -19,6 +20,7 @@ class RankingPrefFormula:
     def __init__(self, domain):
         self.domain = domain
         self.ranks = []
+        self.move = None
 
     # Precond:
     #   None.
@@ -56,6 +58,47 @@ class RankingPrefFormula:
                 return i+1
         return len(self.ranks)+1
 
+    # Precond:
+    #   alts is an (N, attributes) integer array of alternatives.
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns an (N,) integer array of the first rank each alternative
+    #   matches, as eval_DNF or eval_CNF would return it.
+    #   Defaults to # of ranks + 1.
+    def rank_of_batch(self, alts, dnf=False):
+        alts = np.asarray(alts)
+        result = np.full(len(alts), len(self.ranks)+1, dtype=np.int64)
+        rows = np.flatnonzero(self.domain.contains_array(alts))
+        if len(rows) == 0:
+            return result
+        if len(rows) < len(alts):
+            alts = alts[rows]
+        ranks = np.full(len(rows), len(self.ranks)+1, dtype=np.int64)
+        # Later ranks are overwritten by earlier ones, leaving the first match.
+        for i in range(len(self.ranks)-1,-1,-1):
+            ranks[self.ranks[i].satisfied(alts, not dnf)] = i+1
+        result[rows] = ranks
+        return result
+
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns an (N,) int8 array of the relation values of each pair, as
+    #   compare would return them.
+    def compare_batch(self, alt1, alt2, dnf=False):
+        n = len(alt1)
+        ranks = self.rank_of_batch(np.concatenate([np.asarray(alt1), np.asarray(alt2)]), dnf)
+        rank1 = ranks[:n]
+        rank2 = ranks[n:]
+        result = np.full(n, Relation.equal().value, dtype=np.int8)
+        result[rank1 < rank2] = Relation.strict_dispreference().value
+        result[rank1 > rank2] = Relation.strict_preference().value
+        return result
+
     # Precond:
     #   alt1 is a valid Alternative object.
     #   alt2 is a valud Alternative object.
@@ -83,6 +126,7 @@ class RankingPrefFormula:
     # Postcond:
     #   Returns a random RankingPrefFormula object which is a neighbor of this
     #   RankingPrefFormula object.
+    #   The neighbor's move attribute records the change (see neighbors).
     def random_neighbor(self):
         result = RankingPrefFormula(self.domain)
         # Select the formula to change
@@ -92,6 +136,7 @@ class RankingPrefFormula:
                 result.ranks.append(self.ranks[i])
             else:
                 result.ranks.append(self.ranks[i].random_neighbor())
+        result.move = ('rank', formula)
         return result
 
     # Precond:
@@ -99,14 +144,68 @@ class RankingPrefFormula:
     #
     # Postcond:
     #   Iterates through all neighbors of this RankingPrefFormula object.
+    #   Each neighbor's move attribute is ('rank', i) where i is the index of
+    #   the only rank formula which changed.
     def neighbors(self):
         for i in range(len(self.ranks)):
             for form in self.ranks[i].neighbors():
                 temp = RankingPrefFormula(self.domain)
                 temp.ranks.extend(self.ranks)
                 temp.ranks[i] = form
+                temp.move = ('rank', i)
                 yield temp
 
+    # Precond:
+    #   data is a NeighborhoodData object (see annealing/neighborhood.py)
+    #       over this formula's domain.
+    #
+    # Postcond:
+    #   Iterates through pairs (moves, scores), one per literal of each rank
+    #   formula, covering all neighbors in the order neighbors() yields them.
+    #   Each move is ('literal', i, j, lit), replacing literal j of rank i by
+    #   lit, and scores holds the score of each move on the data's examples.
+    #   Every replacement of a literal is scored at once: the rest of its
+    #   formula is evaluated a single time and combined with the truth table
+    #   of all literals.
+    def neighbor_blocks(self, data):
+        literals = list(PrefLiteral.each_literal(self.domain))
+        count = len(data.alts)
+        truth = np.stack([lit.match_array(data.alts) for lit in literals], axis=1)
+        total = len(self.ranks)
+        # first[u] is the first rank before rank i alternative u satisfies
+        # and later[i][u] the first one after it (total+1 if there is none).
+        first = np.full(count, total+1, dtype=np.int64)
+        later = [None for i in range(total)]
+        after = np.full(count, total+1, dtype=np.int64)
+        for i in range(total-1,-1,-1):
+            later[i] = after.copy()
+            after[self.ranks[i].satisfied(data.alts)] = i+1
+        for i in range(total):
+            formula = self.ranks[i]
+            for j in range(len(formula.literals)):
+                keep, rest = formula.substitution(lambda x: x.match_array(data.alts), count, j, True)
+                satisfied = keep[:,None] & (rest[:,None] | truth)
+                ranks = np.where(satisfied, i+1, later[i][:,None])
+                ranks[first <= total] = first[first <= total,None]
+                ranks[~data.valid] = total+1
+                others = [k for k in range(len(literals)) if not literals[k] == formula.literals[j]]
+                scores = data.score_values(ranks[:,others], Relation.strict_dispreference().value)
+                yield ([('literal', i, j, literals[k]) for k in others], scores)
+            unset = first > total
+            first[unset & formula.satisfied(data.alts)] = i+1
+
+    # Precond:
+    #   move is a move from neighbor_blocks.
+    #
+    # Postcond:
+    #   Returns the neighbor the move leads to, as neighbors() builds it.
+    def apply_move(self, move):
+        temp = RankingPrefFormula(self.domain)
+        temp.ranks.extend(self.ranks)
+        temp.ranks[move[1]] = self.ranks[move[1]].replace(move[2], move[3])
+        temp.move = ('rank', move[1])
+        return temp
+
     # Precond:
     #   domain is a valid Domain object.
     #   info is a valid dictionary with the following keys:
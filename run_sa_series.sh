@@ -19,7 +19,7 @@ do
   rm timing.dat
   OUTFILE=$config\_results_SA_13311ASO_full
   echo $config.config
-  python3 wrapper.py -p 3 4 -i 13311ASO_learn.config -o $OUTFILE.csv $config.config
+  python3 wrapper.py -p 3 4 -c truth_cache -i 13311ASO_learn.config -o $OUTFILE.csv $config.config
   zip $OUTFILE.zip $OUTFILE.csv $config.config timing.dat
 done
 
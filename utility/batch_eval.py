@@ -0,0 +1,94 @@
+# File: batch_eval.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   Helpers for comparing many pairs of alternatives at once.
+# Notes:
+#   Pairs are passed as two (N, attributes) integer arrays of attribute
+#   values. Relations are returned as int8 arrays of relation values (see
+#   relation.py).
+#   Models which provide compare_batch(alt1, alt2) are used directly, all
+#   other models are compared one pair at a time.
+
+import sys, os
+sys.path.insert(0, os.path.abspath('..'))
+
+import numpy as np
+from examples.alternative import Alternative
+
+# Stored for a pair when a model cannot compare it (compare returns None).
+# Never equal to a real relation value.
+NO_RELATION = -128
+
+# Precond:
+#   model is an object with a compare(alt1, alt2) method.
+#   alt1 is an (N, attributes) integer array of alternatives.
+#   alt2 is an (N, attributes) integer array of alternatives.
+#   domain is the Domain object of the alternatives, or None.
+#
+# Postcond:
+#   Returns an (N,) int8 array of the relation values the model assigns to
+#   each pair.
+def relation_codes(model, alt1, alt2, domain=None):
+    if hasattr(model, 'compare_batch'):
+        return model.compare_batch(alt1, alt2)
+    result = np.zeros(len(alt1), dtype=np.int8)
+    alt1 = np.asarray(alt1).tolist()
+    alt2 = np.asarray(alt2).tolist()
+    for i in range(len(alt1)):
+        rel = model.compare(Alternative(alt1[i],domain),Alternative(alt2[i],domain))
+        if rel is None:
+            result[i] = NO_RELATION
+        else:
+            result[i] = rel.value
+    return result
+
+# Precond:
+#   model is an object with a compare(alt1, alt2) method.
+#   domain is a valid Domain object.
+#   chunk is the number of pairs to compare at once.
+#
+# Postcond:
+#   Returns a (pair_count,) int8 array of the relation values the model
+#   assigns to every pair of the domain, indexed by pair index (see
+#   Domain.pair_rank).
+def domain_relation_codes(model, domain, chunk=2**16):
+    total = domain.pair_count()
+    result = np.zeros(total, dtype=np.int8)
+    for start in range(0,total,chunk):
+        stop = min(total,start+chunk)
+        alt1, alt2 = domain.pair_arrays(start, stop)
+        result[start:stop] = relation_codes(model, alt1, alt2, domain)
+    return result
+
+# Precond:
+#   ex_set is a valid ExampleSet or ArrayExampleSet object.
+#
+# Postcond:
+#   Returns the examples as a tuple (alt1, alt2, relation, agent) of arrays:
+#   two (N, attributes) arrays of alternatives, an (N,) array of relation
+#   values and an (N,) array of agent IDs (0 for no agent).
+def example_arrays(ex_set):
+    if hasattr(ex_set, 'as_arrays'):
+        return ex_set.as_arrays()
+    examples = ex_set.example_list()
+    alt1 = np.array([ex.get_alts()[0].values for ex in examples], dtype=np.int32)
+    alt2 = np.array([ex.get_alts()[1].values for ex in examples], dtype=np.int32)
+    relation = np.array([ex.get_relation().value for ex in examples], dtype=np.int8)
+    agent = np.zeros(len(examples), dtype=np.int32)
+    for i in range(len(examples)):
+        if examples[i].get_agent() is not None:
+            agent[i] = examples[i].get_agent()
+    return (alt1, alt2, relation, agent)
+
+# Precond:
+#   model is an object with a compare_batch(alt1, alt2) method.
+#   ex_set is a valid ExampleSet or ArrayExampleSet object.
+#
+# Postcond:
+#   Returns a tuple (correct, agent) of (N,) arrays: whether the model agrees
+#   with each example, and the agent ID of each example (0 for no agent).
+def example_agreement(model, ex_set):
+    alt1, alt2, relation, agent = example_arrays(ex_set)
+    if len(relation) == 0:
+        return (np.zeros(0, dtype=bool), agent)
+    return (model.compare_batch(alt1, alt2) == relation, agent)
@@ -0,0 +1,143 @@
+# File: eval_cache.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   A bounded in-memory cache of learner evaluations, shared by the searches
+#   of a run (e.g. hill climbing restarts) so revisited models are not
+#   scored again.
+# Notes:
+#   Learners are identified by their class and node_str(), a canonical
+#   string of the parts of the model which affect its comparisons. Learners
+#   without node_str are always evaluated.
+#   Besides scores, the cache holds the outcome of hill climbing from each
+#   learner a climb passed through (see hillclimb_scored), so a restart
+#   reaching a learner an earlier restart passed through stops there.
+#   Hits and misses count both kinds of lookups.
+#   A cache holds the scores of a single example set; use a new cache for
+#   each example set.
+#   When full, the least recently used entry is dropped.
+
+from collections import OrderedDict
+
+class EvalCache:
+    # Precond:
+    #   capacity is the largest number of entries to keep (at least 1).
+    #
+    # Postcond:
+    #   Builds a new empty EvalCache object.
+    def __init__(self, capacity=2**16):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Precond:
+    #   learner is a preference representation object.
+    #   eval_func is the function the learner is scored by.
+    #
+    # Postcond:
+    #   Returns the cache key of the learner's score, or None if the learner
+    #   has no canonical string.
+    def key(self, learner, eval_func):
+        if not hasattr(learner, 'node_str'):
+            return None
+        return (eval_func, type(learner).__name__, learner.node_str())
+
+    # Precond:
+    #   learner is a preference representation object.
+    #   ex_set is the example set of the cache.
+    #   eval_func is a function which takes a learner and an example set and
+    #       outputs a numeric value.
+    #
+    # Postcond:
+    #   Returns eval_func(learner, ex_set), from the cache when present.
+    def evaluate(self, learner, ex_set, eval_func):
+        key = self.key(learner, eval_func)
+        if key is not None and key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        value = eval_func(learner, ex_set)
+        if key is not None:
+            self.store(key, value)
+        return value
+
+    # Precond:
+    #   learner is a preference representation object.
+    #   eval_func is the function the learner is scored by.
+    #   value is eval_func of the learner on the cache's example set.
+    #
+    # Postcond:
+    #   Records a score computed elsewhere (e.g. in a batch).
+    def put(self, learner, eval_func, value):
+        key = self.key(learner, eval_func)
+        if key is not None:
+            self.store(key, value)
+
+    # Precond:
+    #   learner is a preference representation object.
+    #   eval_func is the function the learner is scored by.
+    #   first_improvement is True for climbs which move to the first
+    #       improving neighbor.
+    #
+    # Postcond:
+    #   Returns the (local maximum, score) pair hill climbing from the learner
+    #   ends on, or None if it is not cached.
+    def climb(self, learner, eval_func, first_improvement=False):
+        key = self.key(learner, eval_func)
+        if key is not None:
+            key = ('climb', first_improvement) + key
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        self.misses += 1
+        return None
+
+    # Precond:
+    #   path is the list of learners a climb passed through.
+    #   eval_func is the function the learners are scored by.
+    #   first_improvement is True for climbs which move to the first
+    #       improving neighbor.
+    #   result is the (local maximum, score) pair the climb ended on.
+    #
+    # Postcond:
+    #   Records the climb's outcome for every learner of the path.
+    def put_climb(self, path, eval_func, first_improvement, result):
+        for learner in path:
+            key = self.key(learner, eval_func)
+            if key is not None:
+                self.store(('climb', first_improvement) + key, result)
+
+    # Precond:
+    #   key is a cache key.
+    #   value is the score to store.
+    #
+    # Postcond:
+    #   Stores the entry, dropping the least recently used one if the cache
+    #   is full.
+    def store(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the proportion of lookups answered from the cache (0 before
+    #   any lookup).
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits/float(total)
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the number of cached entries.
+    def __len__(self):
+        return len(self.entries)
@@ -3,9 +3,22 @@
 # Created On: 11 Dec 2019
 # Purpose:
 #   To provide classes for dealing with preferences specfied using formal logic.
+# Notes:
+#   Over domains of at most COMPILE_LIMIT alternatives a formula is compiled,
+#   on first use, into a boolean vector over the codes of all alternatives
+#   (see Domain.encode), so evaluating it is a single lookup. The vector is
+#   rebuilt when the formula's literals change. PrefLiteral objects are never
+#   modified once built; formulas change by replacing literals.
 
 import random
 import sys, os
+import numpy as np
+from operator import is_
+
+# Largest number of alternatives in a domain for which formulas are compiled.
+# Compiling costs one pass over the domain per literal, so larger domains are
+# evaluated literal by literal instead.
+COMPILE_LIMIT = 2**16
 
 class PrefLiteral:
     # Precond:
@@ -58,6 +71,34 @@ class PrefLiteral:
             return not result
         return result
 
+    # Precond:
+    #   alts is an (N, attributes) integer array of attribute values.
+    #
+    # Postcond:
+    #   Returns an (N,) boolean array which is True for each alternative the
+    #   literal is true according to.
+    #   Defaults to False in the case of failure.
+    def match_array(self, alts):
+        if self.attr >= alts.shape[1]:
+            return np.zeros(len(alts), dtype=bool)
+        result = alts[:,self.attr] == self.value
+        if self.negated:
+            return ~result
+        return result
+
+    # Precond:
+    #   domain is a valid Domain object.
+    #
+    # Postcond:
+    #   Returns a (domain.size(),) boolean array which is True at the code of
+    #   each alternative the literal is true according to.
+    #   Defaults to False in the case of failure.
+    def mask(self, domain):
+        result = domain.literal_mask(self.attr, self.value)
+        if self.negated and self.attr < domain.length():
+            return ~result
+        return result
+
     # Precond:
     #   domain is a valid Domain object.
     #
@@ -139,6 +180,110 @@ class PrefFormula:
         self.clauses = 0
         self.lit_per_clause = 0
         self.literals = []
+        # Maps True (CNF) and False (DNF) to the (clauses, lit_per_clause,
+        # literals) the formula was compiled with and its compiled vector.
+        self.compiled = {}
+        self.move = None
+
+    # Precond:
+    #   truth is a function from a PrefLiteral object to an (N,) boolean
+    #       array of whether the literal holds for each of N alternatives.
+    #   size is N.
+    #   cnf is True for a CNF evaluation and False for a DNF evaluation.
+    #
+    # Postcond:
+    #   Returns an (N,) boolean array of whether each alternative satisfies
+    #   the formula.
+    def combine(self, truth, size, cnf):
+        clauses = int(self.clauses)
+        width = int(self.lit_per_clause)
+        result = np.full(size, cnf, dtype=bool)
+        for i in range(clauses):
+            clause = np.full(size, not cnf, dtype=bool)
+            for j in range(width):
+                if cnf:
+                    clause |= truth(self.literals[i*width + j])
+                else:
+                    clause &= truth(self.literals[i*width + j])
+            if cnf:
+                result &= clause
+            else:
+                result |= clause
+        return result
+
+    # Precond:
+    #   truth is a function from a PrefLiteral object to an (N,) boolean
+    #       array of whether the literal holds for each of N alternatives.
+    #   size is N.
+    #   position is the index of a literal of the formula.
+    #   cnf is True for a CNF evaluation and False for a DNF evaluation.
+    #
+    # Postcond:
+    #   Returns a pair (keep, rest) of (N,) boolean arrays describing the
+    #   formula without the literal at position: keep is the combination of
+    #   the other clauses and rest that of the other literals in its clause.
+    #   With the literal replaced by one whose truth is lit, the formula is
+    #   satisfied by keep & (rest | lit) for CNF, and keep | (rest & lit) for
+    #   DNF.
+    def substitution(self, truth, size, position, cnf):
+        clauses = int(self.clauses)
+        width = int(self.lit_per_clause)
+        keep = np.full(size, cnf, dtype=bool)
+        rest = np.full(size, not cnf, dtype=bool)
+        for i in range(clauses):
+            clause = np.full(size, not cnf, dtype=bool)
+            for j in range(width):
+                if i*width + j == position:
+                    continue
+                if cnf:
+                    clause |= truth(self.literals[i*width + j])
+                else:
+                    clause &= truth(self.literals[i*width + j])
+            if i == position//width:
+                rest = clause
+            elif cnf:
+                keep &= clause
+            else:
+                keep |= clause
+        return (keep, rest)
+
+    # Precond:
+    #   cnf is True for a CNF evaluation and False for a DNF evaluation.
+    #
+    # Postcond:
+    #   Returns a (domain.size(),) boolean array which is True at the code of
+    #   each alternative that satisfies the formula, or None if the domain is
+    #   too large to compile.
+    #   The array is built on first use and kept until the formula changes.
+    def table(self, cnf=True):
+        if self.domain is None or self.domain.size() > COMPILE_LIMIT:
+            return None
+        entry = self.compiled.get(cnf)
+        if entry is not None:
+            clauses, width, literals = entry[0]
+            if (clauses == self.clauses and width == self.lit_per_clause and
+                    len(literals) == len(self.literals) and
+                    all(map(is_, literals, self.literals))):
+                return entry[1]
+        key = (self.clauses, self.lit_per_clause, tuple(self.literals))
+        table = self.combine(lambda x: x.mask(self.domain), self.domain.size(), cnf)
+        self.compiled[cnf] = (key, table)
+        return table
+
+    # Precond:
+    #   alts is an (N, attributes) integer array of alternatives in the
+    #       formula's domain.
+    #   cnf is True for a CNF evaluation and False for a DNF evaluation.
+    #
+    # Postcond:
+    #   Returns an (N,) boolean array of whether each alternative satisfies
+    #   the formula.
+    def satisfied(self, alts, cnf=True):
+        alts = np.asarray(alts)
+        table = self.table(cnf)
+        if table is not None and alts.shape[1] == self.domain.length():
+            return table[self.domain.encode_array(alts)]
+        return self.combine(lambda x: x.match_array(alts), len(alts), cnf)
 
     # Precond:
     #   alt is a valid alternative.
@@ -148,6 +293,9 @@ class PrefFormula:
     #   CNF evaluation.
     #   Defaults to True
     def eval_CNF(self, alt):
+        table = self.table(True)
+        if table is not None and alt.matches(self.domain):
+            return bool(table[alt.code(self.domain)])
         clause = False
         clauseIndex = 0
         for i in range(self.clauses):
@@ -169,6 +317,9 @@ class PrefFormula:
     #   DNF evaluation.
     #   Defaults to False
     def eval_DNF(self, alt):
+        table = self.table(False)
+        if table is not None and alt.matches(self.domain):
+            return bool(table[alt.code(self.domain)])
         clause = True
         clauseIndex = 0
         for i in range(self.clauses):
@@ -188,6 +339,8 @@ class PrefFormula:
     #
     # Postcond:
     #   Returns a random PrefFormula that is a neighbor to this PrefFormula.
+    #   The neighbor's move attribute is ('literal', i) where i is the index
+    #   of the replaced literal.
     def random_neighbor(self):
         result = PrefFormula(self.domain)
         result.clauses = self.clauses
@@ -202,6 +355,7 @@ class PrefFormula:
                 while lit_mod == self.literals[i]:
                     lit_mod = PrefLiteral.random(self.domain)
                 result.literals.append(lit_mod)
+        result.move = ('literal', lit_change)
         return result
 
     # Precond:
@@ -209,18 +363,30 @@ class PrefFormula:
     #
     # Postcond:
     #   Iterates through all neighbors of the given PrefFormula
+    #   Each neighbor's move attribute is ('literal', i) where i is the index
+    #   of the replaced literal.
     def neighbors(self):
         for i in range(len(self.literals)):
             for lit in PrefLiteral.each_literal(self.domain):
                 if lit == self.literals[i]:
                     continue
-                # create new object and copy over.
-                temp = PrefFormula(self.domain)
-                temp.clauses = self.clauses
-                temp.lit_per_clause = self.lit_per_clause
-                temp.literals.extend(self.literals)
-                temp.literals[i] = lit
-                yield temp
+                yield self.replace(i, lit)
+
+    # Precond:
+    #   position is the index of a literal of the formula.
+    #   lit is a valid PrefLiteral object.
+    #
+    # Postcond:
+    #   Returns a copy of the formula with the literal at position replaced by
+    #   lit. The copy's move attribute is ('literal', position).
+    def replace(self, position, lit):
+        temp = PrefFormula(self.domain)
+        temp.clauses = self.clauses
+        temp.lit_per_clause = self.lit_per_clause
+        temp.literals.extend(self.literals)
+        temp.literals[position] = lit
+        temp.move = ('literal', position)
+        return temp
 
     # Precond:
     #   clauses is the number of clauses to generate.
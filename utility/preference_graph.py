@@ -19,8 +19,18 @@ class PreferenceGraph:
         self.closed = False
         self.domain = domain
         self.nodes = {}
-        for outcome in domain.each():
-            self.nodes[str(outcome)] = [set([]),False,False]
+        for code in range(domain.size()):
+            self.nodes[code] = [set([]),False,False]
+
+    # Precond:
+    #   outcome is a valid Alternative object or a node key.
+    #
+    # Postcond:
+    #   Returns the node key (the integer code of the outcome).
+    def _key(self, outcome):
+        if isinstance(outcome, int):
+            return outcome
+        return self.domain.encode(outcome)
 
     # Precond:
     #   start is a valid Alternative object.
@@ -29,7 +39,7 @@ class PreferenceGraph:
     # Postcond:
     #   Adds the arc to the graph.
     def arc(self, start, to):
-        self.nodes[str(start)][0].add(str(to))
+        self.nodes[self._key(start)][0].add(self._key(to))
         self.closed = False
 
     # Precond:
@@ -55,9 +65,9 @@ class PreferenceGraph:
     def share_arcs(self, nodes):
         arcs = set([])
         for node in nodes:
-            arcs |= self.nodes[str(node)][0]
+            arcs |= self.nodes[self._key(node)][0]
         for node in nodes:
-            self.nodes[str(node)][0] = arcs
+            self.nodes[self._key(node)][0] = arcs
 
     # Precond:
     #   node is the key for a node.
@@ -114,8 +124,8 @@ class PreferenceGraph:
     #   Reutrns true if there is a path from the start outcome
     #   to the to outcome, in the transitive closure.
     def transitive_path(self, start, to):
-        s = str(start)
-        t = str(to)
+        s = self._key(start)
+        t = self._key(to)
         if t in self.nodes[s][0]:
             return True
         return False
@@ -130,13 +140,13 @@ class PreferenceGraph:
     # TODO: FIX
     def path(self, start, to):
         self.unmark()
-        if str(start) == str(to):
+        if self._key(start) == self._key(to):
             return False
-        return self.path_internal(str(start),str(to))
+        return self.path_internal(self._key(start),self._key(to))
 
     # Precond:
-    #   start is a string.
-    #   to is a string.
+    #   start is a node key.
+    #   to is a node key.
     #
     # Postcond:
     #   Reutrns true if there is a path from the start outcome
@@ -197,8 +207,8 @@ class PreferenceGraph:
                     yield (outcome,comp)
 
     # Precond:
-    #   start is a string representing a node.
-    #   to is a string representing a node.
+    #   start is a node key.
+    #   to is a node key.
     #
     # Postcond:
     #   Returns true if there is an arc from start to to.
@@ -225,4 +235,4 @@ class PreferenceGraph:
     def print_graph(self):
         for outcome in self.nodes.keys():
             for to in self.nodes[outcome][0]:
-                print(outcome,"->",to)
+                print(str(self.domain.decode(outcome)),"->",str(self.domain.decode(to)))
@@ -0,0 +1,147 @@
+# File: truth_cache.py
+# Created On: 18 Oct 2026
+# Purpose:
+#   An on-disk cache of agents' ground truth arrays (see Agent.ground_truth)
+#   shared between processes.
+# Notes:
+#   Entries are .npy files named by a SHA-256 hash of the agent's domain and
+#   model strings, and are opened memory-mapped and read-only, so processes
+#   evaluating the same model share one copy through the page cache.
+#   Entries are written to a temporary file and renamed into place, so
+#   readers never see a partial entry.
+#   Reading an entry refreshes its modification time; when the cache grows
+#   past its size bound the least recently used entries are removed.
+#   Models whose class does not define __str__ are never cached, since their
+#   default string (an object address) does not identify the model. Keys also
+#   hash the model's class and, when it has one, its node_str(), which keeps
+#   structure some strings leave out (such as where one ASO rule ends and the
+#   next begins).
+
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+class TruthCache:
+    # Precond:
+    #   directory is the path of the cache directory (created if missing).
+    #   max_bytes is the bound on the total size of the cached entries.
+    #
+    # Postcond:
+    #   Builds a new TruthCache object over the directory.
+    def __init__(self, directory, max_bytes=2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+
+    # Precond:
+    #   agent is a valid Agent object with a domain.
+    #
+    # Postcond:
+    #   Returns the cache key of the agent's ground truth, or None if the
+    #   agent's model cannot be identified by its string.
+    def key(self, agent):
+        if type(agent.model).__str__ is object.__str__:
+            return None
+        content = str(agent.domain) + "\n" + type(agent.model).__name__ + "\n" + str(agent.model)
+        if hasattr(agent.model, 'node_str'):
+            content += "\n" + agent.model.node_str()
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    # Precond:
+    #   key is a cache key.
+    #
+    # Postcond:
+    #   Returns the path of the entry for the key.
+    def path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    # Precond:
+    #   key is a cache key.
+    #
+    # Postcond:
+    #   Returns the cached array memory-mapped read-only, or None if there is
+    #   no entry for the key.
+    def load(self, key):
+        path = self.path(key)
+        try:
+            result = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    # Precond:
+    #   key is a cache key.
+    #   array is the numpy array to store.
+    #
+    # Postcond:
+    #   Stores the array under the key, evicts old entries if needed and
+    #   returns the stored array memory-mapped read-only.
+    def store(self, key, array):
+        handle, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as fout:
+                np.save(fout, array)
+            os.replace(temp, self.path(key))
+        except OSError:
+            if os.path.exists(temp):
+                os.remove(temp)
+            return array
+        self.evict(key)
+        result = self.load(key)
+        if result is None:
+            return array
+        return result
+
+    # Precond:
+    #   keep is a cache key which should not be evicted, or None.
+    #
+    # Postcond:
+    #   Removes the least recently used entries until the cache fits in its
+    #   size bound.
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npy'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+        entries.sort()
+        keep_path = None
+        if keep is not None:
+            keep_path = self.path(keep)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    # Precond:
+    #   agent is a valid Agent object with a domain.
+    #   compute is a function taking no arguments which returns the agent's
+    #       ground truth array.
+    #
+    # Postcond:
+    #   Returns the agent's ground truth, from the cache when possible,
+    #   otherwise computing and storing it.
+    def fetch(self, agent, compute):
+        key = self.key(agent)
+        if key is None:
+            return compute()
+        result = self.load(key)
+        if result is None:
+            result = self.store(key, compute())
+        return result
@@ -3,6 +3,11 @@
 # Created On: 13 Dec 2019
 # Purpose:
 #   Provides a class for dealing with penalty logic preference representations.
+# Notes:
+#   Over domains of at most COMPILE_LIMIT alternatives the penalty of every
+#   alternative is computed once and kept, so comparisons are two lookups.
+#   Penalties are summed formula by formula in the same order as eval_CNF and
+#   eval_DNF, so batch penalties are identical to theirs.
 
 import sys, os
 sys.path.insert(0, os.path.abspath('..'))
@@ -10,7 +15,9 @@ sys.path.insert(0, os.path.abspath('..'))
 
 import random
 import math
-from utility.pref_logic import PrefFormula
+import numpy as np
+from operator import is_
+from utility.pref_logic import PrefFormula, COMPILE_LIMIT
 from examples.relation import Relation
 
 class PenaltyLogic:
@@ -23,6 +30,9 @@ class PenaltyLogic:
         self.domain = domain
         self.formulas = []
         self.weights = []
+        # Maps True (DNF) and False (CNF) to the (formulas, weights) the
+        # penalty table was built from and the table.
+        self.tables = {}
 
     # Precond:
     #   None.
@@ -42,6 +52,9 @@ class PenaltyLogic:
     def eval_CNF(self, alt):
         if not alt.matches(self.domain):
             return -1.0
+        table = self.penalty_table(False)
+        if table is not None:
+            return float(table[alt.code(self.domain)])
         total = 0.0
         for i in range(len(self.formulas)):
             if not self.formulas[i].eval_CNF(alt):
@@ -58,12 +71,91 @@ class PenaltyLogic:
     def eval_DNF(self, alt):
         if not alt.matches(self.domain):
             return -1.0
+        table = self.penalty_table(True)
+        if table is not None:
+            return float(table[alt.code(self.domain)])
         total = 0.0
         for i in range(len(self.formulas)):
             if not self.formulas[i].eval_DNF(alt):
                 total += self.weights[i]
         return total
 
+    # Precond:
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns a (domain.size(),) float array of the penalty of the
+    #   alternative with each code, or None if the domain is too large to
+    #   enumerate.
+    #   The array is built on first use and kept until the formulas or
+    #   weights change.
+    def penalty_table(self, dnf=True):
+        if self.domain is None or self.domain.size() > COMPILE_LIMIT:
+            return None
+        entry = self.tables.get(dnf)
+        if entry is not None:
+            formulas, weights = entry[0]
+            if (len(formulas) == len(self.formulas) and
+                    all(map(is_, formulas, self.formulas)) and
+                    weights == tuple(self.weights)):
+                return entry[1]
+        key = (tuple(self.formulas), tuple(self.weights))
+        table = self.penalties(self.domain.decode_array(np.arange(self.domain.size())), dnf)
+        self.tables[dnf] = (key, table)
+        return table
+
+    # Precond:
+    #   alts is an (N, attributes) integer array of alternatives in the
+    #       domain.
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns an (N,) float array of the penalty of each alternative: the
+    #   weights of the formulas it does not satisfy, summed in order.
+    def penalties(self, alts, dnf=True):
+        total = np.zeros(len(alts))
+        for i in range(len(self.formulas)):
+            satisfied = self.formulas[i].satisfied(alts, not dnf)
+            total[~satisfied] += self.weights[i]
+        return total
+
+    # Precond:
+    #   alts is an (N, attributes) integer array of alternatives.
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns an (N,) float array of the penalty of each alternative, as
+    #   eval_DNF or eval_CNF would return it.
+    #   Defaults to -1 (impossible value)
+    def score(self, alts, dnf=True):
+        alts = np.asarray(alts)
+        result = np.full(len(alts), -1.0)
+        inside = self.domain.contains_array(alts)
+        if not inside.any():
+            return result
+        table = self.penalty_table(dnf)
+        if table is not None:
+            result[inside] = table[self.domain.encode_array(alts[inside])]
+        else:
+            result[inside] = self.penalties(alts[inside], dnf)
+        return result
+
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #   dnf is a boolean which is true when DNF evaluation is used.
+    #
+    # Postcond:
+    #   Returns an (N,) int8 array of the relation values of each pair, as
+    #   compare would return them.
+    def compare_batch(self, alt1, alt2, dnf=True):
+        val1 = self.score(alt1, dnf)
+        val2 = self.score(alt2, dnf)
+        result = np.full(len(val1), Relation.equal().value, dtype=np.int8)
+        result[val1 > val2] = Relation.strict_dispreference().value
+        result[val1 < val2] = Relation.strict_preference().value
+        return result
+
     # Precond:
     #   alt1 is a valid Alternative object.
     #   alt2 is a valud Alternative object.
@@ -169,3 +261,13 @@ class PenaltyLogic:
             result += ' '.join(['P',str(self.weights[i]),str(self.formulas[i])])
             result += "\n"
         return result
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns a unique string for use in a neighborhood evaluation graph or
+    #   an evaluation cache.
+    def node_str(self):
+        ns_func = lambda i: str(self.weights[i]) + '*' + self.formulas[i].node_str()
+        return ';'.join(list(map(ns_func,range(len(self.formulas)))))
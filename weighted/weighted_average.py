@@ -3,6 +3,14 @@
 # Created On: 13 Dec 2019
 # Purpose:
 #   Defines a class which handles weight average preference representations.
+# Notes:
+#   The utility of each value of each attribute is kept in an (attributes,
+#   values) matrix. Over domains of at most COMPILE_LIMIT alternatives, batch
+#   scoring also keeps the score of every alternative once it has scored as
+#   many alternatives as the domain holds. Both are dropped by reset_tables,
+#   which is called wherever orders or weights are set. Scores are summed
+#   attribute by attribute in the same order as eval, so batch scores are
+#   identical to those of eval.
 
 import sys, os
 sys.path.insert(0, os.path.abspath('..'))
@@ -10,8 +18,17 @@ sys.path.insert(0, os.path.abspath('..'))
 
 from random import random, shuffle
 import math
+import numpy as np
+from itertools import permutations
+from utility.pref_logic import COMPILE_LIMIT
+from utility.batch_eval import example_arrays
 from examples.relation import Relation
 
+# Largest number of attribute values for which learn_linear scores every
+# value order of an attribute (values! candidates); larger attributes only
+# try moving one value to another position.
+ORDER_PERMUTATION_LIMIT = 6
+
 class WeightedAverage:
     # Precond:
     #   domain is a valid Domain object.
@@ -22,6 +39,23 @@ class WeightedAverage:
         self.domain = domain
         self.orders = []
         self.weights = []
+        self.reset_tables()
+
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Drops the utility matrix and domain score vector, so they are rebuilt
+    #   on next use. Must be called after changing orders or weights once the
+    #   object has been evaluated.
+    def reset_tables(self):
+        # The utility matrix, the same as nested lists for eval, the domain
+        # score vector and the number of alternatives scored in batches
+        # since the last reset.
+        self.matrix = None
+        self.utilities = None
+        self.table = None
+        self.scored = 0
 
     # Precond:
     #   alt is a valid Alternative object.
@@ -32,9 +66,11 @@ class WeightedAverage:
     def eval(self, alt):
         if not alt.matches(self.domain):
             return 0
+        if self.utilities is None:
+            self.utility_matrix()
         total = 0
         for i in range(len(self.weights)):
-            total += self.orders[i].index(alt.value(i)-1)*self.weights[i]
+            total += self.utilities[i][alt.value(i)]
         return total
 
     # Precond:
@@ -46,12 +82,85 @@ class WeightedAverage:
     def compare(self, alt1, alt2):
         val1 = self.eval(alt1)
         val2 = self.eval(alt2)
-        if val1 > val1:
+        if val1 > val2:
             return Relation.strict_preference()
         elif val1 < val2:
             return Relation.strict_dispreference()
         return Relation.equal()
 
+    # Precond:
+    #   None.
+    #
+    # Postcond:
+    #   Returns the (attributes, largest value+1) utility matrix, where
+    #   matrix[i][v] is the utility of value v of attribute i.
+    #   The matrix is built on first use and kept until reset_tables.
+    def utility_matrix(self):
+        if self.matrix is None:
+            width = max([len(order) for order in self.orders] + [0])
+            matrix = np.zeros((len(self.weights), width+1))
+            for i in range(len(self.weights)):
+                for j in range(len(self.orders[i])):
+                    matrix[i][self.orders[i][j]+1] = j*self.weights[i]
+            self.matrix = matrix
+            self.utilities = matrix.tolist()
+        return self.matrix
+
+    # Precond:
+    #   matrix is a utility matrix (see utility_matrix).
+    #   alts is an (N, attributes) integer array of alternatives in the
+    #       domain.
+    #
+    # Postcond:
+    #   Returns an (N,) float array of the score of each alternative.
+    def sum_utilities(self, matrix, alts):
+        total = np.zeros(len(alts))
+        for i in range(len(self.weights)):
+            total += matrix[i][alts[:,i]]
+        return total
+
+    # Precond:
+    #   alts is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Returns an (N,) float array of the score of each alternative, as eval
+    #   would return it.
+    #   Returns 0 by default.
+    #   Once as many alternatives as the domain holds have been scored (and
+    #   the domain has at most COMPILE_LIMIT alternatives), the score of every
+    #   alternative is computed and kept, and later batches are lookups.
+    def score(self, alts):
+        alts = np.asarray(alts)
+        result = np.zeros(len(alts))
+        inside = self.domain.contains_array(alts)
+        if not inside.any():
+            return result
+        matrix = self.utility_matrix()
+        self.scored += len(alts)
+        if (self.table is None and self.domain.size() <= COMPILE_LIMIT and
+                self.scored >= self.domain.size()):
+            self.table = self.sum_utilities(matrix, self.domain.decode_array(np.arange(self.domain.size())))
+        if self.table is not None:
+            result[inside] = self.table[self.domain.encode_array(alts[inside])]
+        else:
+            result[inside] = self.sum_utilities(matrix, alts[inside])
+        return result
+
+    # Precond:
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Returns an (N,) int8 array of the relation values of each pair, as
+    #   compare would return them.
+    def compare_batch(self, alt1, alt2):
+        val1 = self.score(alt1)
+        val2 = self.score(alt2)
+        result = np.full(len(val1), Relation.equal().value, dtype=np.int8)
+        result[val1 > val2] = Relation.strict_preference().value
+        result[val1 < val2] = Relation.strict_dispreference().value
+        return result
+
     # Precond:
     #   domain is a valid domain object.
     #   info is a dictionary (no information used, but important for typing).
@@ -72,8 +181,147 @@ class WeightedAverage:
         total = math.sqrt(total)
         for i in range(len(result.weights)):
             result.weights[i] = result.weights[i]/total
+        result.reset_tables()
+        return result
+
+    # Precond:
+    #   ex_set is a valid ExampleSet or ArrayExampleSet object.
+    #   domain is a valid Domain object.
+    #   rounds is the number of times the weights and the value orders are
+    #       refit in turn.
+    #   epochs is the number of perceptron passes per weight fit.
+    #
+    # Postcond:
+    #   Returns a WeightedAverage object learned from the example set.
+    #   Value orders start from each value's net wins over the strict
+    #   examples. Weights are then fit by a batch perceptron on the
+    #   differences of the pairs' value positions, keeping the best weights
+    #   seen (pocket), and each attribute's order is replaced by the
+    #   candidate order agreeing with the most examples given the other
+    #   attributes. Candidates of an attribute are scored together as one
+    #   matrix product. The learner is deterministic and does not modify the
+    #   example set.
+    @staticmethod
+    def learn_linear(ex_set, domain, rounds=3, epochs=100):
+        alt1, alt2, relation, _ = example_arrays(ex_set)
+        alt1 = np.asarray(alt1, dtype=np.int64)
+        alt2 = np.asarray(alt2, dtype=np.int64)
+        attrs = domain.length()
+        prefer = relation == Relation.strict_preference().value
+        strict = prefer | (relation == Relation.strict_dispreference().value)
+        sign = np.where(prefer, 1.0, -1.0)[strict]
+        orders = []
+        for i in range(attrs):
+            size = domain.attr_length(i)
+            winner = np.where(prefer, alt1[:,i], alt2[:,i])[strict]
+            loser = np.where(prefer, alt2[:,i], alt1[:,i])[strict]
+            wins = np.bincount(winner, minlength=size+1) - np.bincount(loser, minlength=size+1)
+            # Stable sort, so ties keep the smaller value first.
+            orders.append((np.argsort(wins[1:], kind='stable')).tolist())
+        weights = np.ones(attrs)/math.sqrt(max(attrs, 1))
+        for round in range(rounds):
+            diffs = WeightedAverage.position_diffs(orders, alt1, alt2)
+            weights = WeightedAverage.fit_weights(diffs[strict]*sign[:,None], epochs, weights)
+            for i in range(attrs):
+                orders[i] = WeightedAverage.best_order(orders, weights, alt1, alt2, relation, i, domain.attr_length(i))
+        result = WeightedAverage(domain)
+        total = math.sqrt(float(np.dot(weights, weights)))
+        if total == 0:
+            weights = np.ones(attrs)
+            total = math.sqrt(float(attrs))
+        result.weights = [float(w)/total for w in weights]
+        result.orders = orders
+        result.reset_tables()
+        return result
+
+    # Precond:
+    #   orders is a list of value orders (0-based values, least preferred
+    #       first), one per attribute.
+    #   alt1 is an (N, attributes) integer array of alternatives.
+    #   alt2 is an (N, attributes) integer array of alternatives.
+    #
+    # Postcond:
+    #   Returns the (N, attributes) float array of the position of each
+    #   attribute's value in alt1 minus its position in alt2.
+    @staticmethod
+    def position_diffs(orders, alt1, alt2):
+        result = np.zeros(alt1.shape)
+        for i in range(len(orders)):
+            position = np.zeros(len(orders[i])+1)
+            position[np.asarray(orders[i], dtype=np.int64)+1] = np.arange(len(orders[i]))
+            result[:,i] = position[alt1[:,i]] - position[alt2[:,i]]
         return result
 
+    # Precond:
+    #   signed is an (M, attributes) float array of the position differences
+    #       of the strict examples, negated where the second alternative is
+    #       preferred.
+    #   epochs is the number of perceptron passes.
+    #   weights is the (attributes,) array of starting weights.
+    #
+    # Postcond:
+    #   Returns the non-negative weights, among those the batch perceptron
+    #   visits, with the most examples strictly on the correct side (the
+    #   earliest on ties).
+    @staticmethod
+    def fit_weights(signed, epochs, weights):
+        best = weights.copy()
+        if len(signed) == 0:
+            return best
+        best_correct = np.count_nonzero(signed.dot(weights) > 0)
+        scale = 1.0/len(signed)
+        for epoch in range(epochs):
+            wrong = signed.dot(weights) <= 0
+            if not wrong.any():
+                break
+            weights = np.maximum(weights + signed[wrong].sum(axis=0)*scale, 0.0)
+            correct = np.count_nonzero(signed.dot(weights) > 0)
+            if correct > best_correct:
+                best = weights.copy()
+                best_correct = correct
+        return best
+
+    # Precond:
+    #   orders is a list of value orders, one per attribute.
+    #   weights is the (attributes,) array of weights.
+    #   alt1, alt2 and relation are the example arrays.
+    #   attr is the attribute whose order is chosen.
+    #   size is the number of values of the attribute.
+    #
+    # Postcond:
+    #   Returns the order of attr, among the current one and the candidates,
+    #   under which the model agrees with the most examples (the current
+    #   order, then the earliest candidate, on ties).
+    @staticmethod
+    def best_order(orders, weights, alt1, alt2, relation, attr, size):
+        current = orders[attr]
+        if size <= ORDER_PERMUTATION_LIMIT:
+            candidates = [list(order) for order in permutations(range(size))]
+        else:
+            candidates = []
+            for i in range(size):
+                for j in range(size):
+                    if i != j:
+                        order = current[:i] + current[i+1:]
+                        order.insert(j, current[i])
+                        candidates.append(order)
+        candidates.insert(0, current)
+        # positions[v, k] is the position of value v (1-based) in candidate k.
+        positions = np.zeros((size+1, len(candidates)))
+        for k in range(len(candidates)):
+            positions[np.asarray(candidates[k], dtype=np.int64)+1, k] = np.arange(size)
+        # change[n, v] is +1 where alt1 has value v and -1 where alt2 does.
+        change = np.zeros((len(alt1), size+1))
+        change[np.arange(len(alt1)), alt1[:,attr]] += 1
+        change[np.arange(len(alt1)), alt2[:,attr]] -= 1
+        diffs = WeightedAverage.position_diffs(orders, alt1, alt2)
+        base = diffs.dot(weights) - diffs[:,attr]*weights[attr]
+        scores = base[:,None] + change.dot(positions)*weights[attr]
+        codes = np.where(scores > 0, Relation.strict_preference().value,
+                         np.where(scores < 0, Relation.strict_dispreference().value, Relation.equal().value))
+        agree = np.count_nonzero(codes == relation[:,None], axis=0)
+        return candidates[int(np.argmax(agree))]
+
     # Precond:
     #   domain is a valid Domain object.
     #   info is a valid dictionary (data unused, but important for typing).
@@ -102,6 +350,7 @@ class WeightedAverage:
                 order = line[2].split(',')
                 order = list(map(lambda x: int(x), order))
                 result.orders.append(order)
+        result.reset_tables()
         return result
 
     # Precond:
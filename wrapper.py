@@ -26,6 +26,7 @@ def main(args, mp_n):
         call += '-p ' + ' '.join(prob) + ' '
         if len(args.learn_conf) == 1:
             call += '-i ' + args.learn_conf[0] + ' '
+        call += extra_flags(args)
         call += "-o " + args.output[0] + " "
         call += "temp_agent.config >> timing.dat"
         runs = 25
@@ -48,6 +49,7 @@ def main_multi(args, mp_n):
     call += '-p ' + ' '.join(prob) + ' '
     if len(args.learn_conf) == 1:
         call += '-i ' + args.learn_conf[0] + ' '
+    call += extra_flags(args)
     call += args.config[0] + " >> timing.dat"
     runs = 25
     label = ''
@@ -78,6 +80,7 @@ def main_neighbor(args, mp_n):
     call += '-p ' + ' '.join(prob) + ' '
     if len(args.learn_conf) == 1:
         call += '-i ' + args.learn_conf[0] + ' '
+    call += extra_flags(args)
     call += args.config[0] + " >> timing.dat"
     runs = 25
     label = ''
@@ -94,6 +97,24 @@ def main_neighbor(args, mp_n):
     print("Full Time:",time.time()-start)
     return 0
 
+def extra_flags(args):
+    result = '-L ' + args.learner[0] + ' '
+    result += '--schedule ' + args.schedule[0] + ' '
+    if args.time_limit is not None:
+        result += '--time-limit ' + str(args.time_limit[0]) + ' '
+    if args.max_evals is not None:
+        result += '--max-evals ' + str(args.max_evals[0]) + ' '
+    if args.patience is not None:
+        result += '--patience ' + str(args.patience[0]) + ' '
+    result += '--starts ' + str(args.starts[0]) + ' --workers ' + str(args.workers[0]) + ' '
+    result += '--replicas ' + str(args.replicas[0]) + ' '
+    result += '--eval-cache ' + str(args.eval_cache[0]) + ' '
+    if args.race is not None:
+        result += '--race ' + str(args.race[0]) + ' '
+    if args.truth_cache is not None:
+        result += '-c ' + args.truth_cache[0] + ' -C ' + str(args.truth_cache_mb[0]) + ' '
+    return result
+
 def pill_label(types, holder, domain):
     for type in types:
         if holder.type.lower() == type.string_id().lower():
@@ -106,6 +127,18 @@ def build_parser():
     parser.add_argument('-l', dest='layers', metavar='n', type=int, nargs=1, default=[3], help='The number of neural net layers')
     parser.add_argument('-i', dest='learn_conf', metavar='filename', type=str, nargs=1, help='Name of the learner configuration file.', default='a.exs')
     parser.add_argument('-o', dest='output', metavar='filename', type=str, nargs=1, help='Name of the output file.', default='a.exs')
+    parser.add_argument('-L', dest='learner', metavar='name', type=str, nargs=1, default=['greedy'], choices=['greedy','exact','wa'], help='The learning algorithm for problem 2: greedy or exact (LPMs), or wa (weighted averages). Problem 2 3 (maximin) only supports greedy.')
+    parser.add_argument('--schedule', dest='schedule', metavar='name', type=str, nargs=1, default=['geometric'], choices=['geometric','lundy-mees','adaptive'], help='The SA cooling schedule (geometric, lundy-mees or adaptive).')
+    parser.add_argument('--time-limit', dest='time_limit', metavar='seconds', type=float, nargs=1, default=None, help='Stop each SA or parallel tempering run after this many seconds.')
+    parser.add_argument('--max-evals', dest='max_evals', metavar='n', type=int, nargs=1, default=None, help='Stop each SA run, or each parallel tempering replica, after this many neighbor evaluations.')
+    parser.add_argument('--patience', dest='patience', metavar='n', type=int, nargs=1, default=None, help='Stop each SA run after this many steps without an improving move.')
+    parser.add_argument('--starts', dest='starts', metavar='k', type=int, nargs=1, default=[1], help='The number of independent SA chains per run (the best is kept).')
+    parser.add_argument('--workers', dest='workers', metavar='n', type=int, nargs=1, default=[1], help='The number of processes running SA chains.')
+    parser.add_argument('--replicas', dest='replicas', metavar='r', type=int, nargs=1, default=[1], help='Learn with parallel tempering over this many replicas (one process each) instead of SA.')
+    parser.add_argument('--eval-cache', dest='eval_cache', metavar='n', type=int, nargs=1, default=[2**16], help='The number of model scores and hill climbing outcomes kept by the hill climbing restart searches.')
+    parser.add_argument('--race', dest='race', metavar='delta', type=float, nargs=1, default=None, help='Race the hill climbing restart searches on growing example subsets, with confidence bounds failing with probability delta. Dropped restarts are discarded, so pills only cover the restarts which finish.')
+    parser.add_argument('-c', dest='truth_cache', metavar='directory', type=str, nargs=1, default=None, help='Directory in which to cache agent ground truths between runs.')
+    parser.add_argument('-C', dest='truth_cache_mb', metavar='n', type=int, nargs=1, default=[1024], help='Size bound of the ground truth cache in megabytes.')
     parser.add_argument('config', metavar='filename', type=str, nargs=1, help="The config file to use.")
     return parser
 